@@ -1,5 +1,15 @@
-from IPython.display import display, HTML
+from array import array
+import asyncio
+import collections
+import itertools
+import json
+import shutil
+import struct
+import subprocess
+import sys
 import time
+import uuid
+import zlib
 import math
 import re
 
@@ -13,6 +23,11 @@ import re
 
 # Module for drawing classic Turtle figures on Google Colab notebooks.
 # It uses html capabilites of IPython library to draw svg shapes inline.
+# IPython is only imported when a notebook backend is used; with the 'svg' backend drawings can be
+# made in plain scripts and written to svg or png files with save().
+# Drawings are made by Turtle objects on Canvas objects; several turtles can share a canvas and
+# several canvases can be shown at once. The procedural functions (fd, lt, jumpto...) drive the
+# turtle created by the latest make_turtle() call.
 # Looks of the figures are inspired from Blockly Games / Turtle (blockly-games.appspot.com/turtle)
 
 DEFAULT_WINDOW_SIZE = (300, 150)
@@ -23,29 +38,60 @@ DEFAULT_TURTLE_COLOR = 'gray'
 DEFAULT_TURTLE_DEGREE = 0
 DEFAULT_BACKGROUND_COLOR = 'white'
 DEFAULT_IS_PEN_DOWN = True
-DEFAULT_SVG_LINES_STRING = ""
 DEFAULT_PEN_WIDTH = 2
+DEFAULT_TRACER = 1
+DEFAULT_BACKEND = 'html'
+DEFAULT_FPS = 30
+DEFAULT_ANIMATION = 'sync'
+VALID_ANIMATIONS = ('sync', 'async')
+HOOK_EVENTS = ('move', 'update', 'svg')
+MAX_QUEUED_FRAMES = 256  # frames waiting to be played in 'async' animation mode; later ones are merged
+DEFAULT_PRECISION = 3  # decimal digits of path coordinates
+SIMPLIFY_CHUNK = 256  # points simplified together when a simplification tolerance is set
+PATH_SPLIT_POINTS = 1024  # points after which a path is continued in a new <path>, so culling stays local
+GRID_CELL = 256  # side of the cells of the spatial index of the drawing
+LARGE_ITEM_CELLS = 64  # primitives covering more cells than this are tested one by one instead
 # all 140 color names that modern browsers support. taken from https://www.w3schools.com/colors/colors_names.asp
 VALID_COLORS = ('black', 'navy', 'darkblue', 'mediumblue', 'blue', 'darkgreen', 'green', 'teal', 'darkcyan', 'deepskyblue', 'darkturquoise', 'mediumspringgreen', 'lime', 'springgreen', 'aqua', 'cyan', 'midnightblue', 'dodgerblue', 'lightseagreen', 'forestgreen', 'seagreen', 'darkslategray', 'darkslategrey', 'limegreen', 'mediumseagreen', 'turquoise', 'royalblue', 'steelblue', 'darkslateblue', 'mediumturquoise', 'indigo', 'darkolivegreen', 'cadetblue', 'cornflowerblue', 'rebeccapurple', 'mediumaquamarine', 'dimgray', 'dimgrey', 'slateblue', 'olivedrab', 'slategray', 'slategrey', 'lightslategray', 'lightslategrey', 'mediumslateblue', 'lawngreen', 'chartreuse', 'aquamarine', 'maroon', 'purple', 'olive', 'gray', 'grey', 'skyblue', 'lightskyblue', 'blueviolet', 'darkred', 'darkmagenta', 'saddlebrown', 'darkseagreen', 'lightgreen', 'mediumpurple', 'darkviolet', 'palegreen', 'darkorchid', 'yellowgreen', 'sienna', 'brown', 'darkgray', 'darkgrey', 'lightblue', 'greenyellow', 'paleturquoise', 'lightsteelblue', 'powderblue', 'firebrick', 'darkgoldenrod', 'mediumorchid', 'rosybrown', 'darkkhaki', 'silver', 'mediumvioletred', 'indianred', 'peru', 'chocolate', 'tan', 'lightgray', 'lightgrey', 'thistle', 'orchid', 'goldenrod', 'palevioletred', 'crimson', 'gainsboro', 'plum', 'burlywood', 'lightcyan', 'lavender', 'darksalmon', 'violet', 'palegoldenrod', 'lightcoral', 'khaki', 'aliceblue', 'honeydew', 'azure', 'sandybrown', 'wheat', 'beige', 'whitesmoke', 'mintcream', 'ghostwhite', 'salmon', 'antiquewhite', 'linen', 'lightgoldenrodyellow', 'oldlace', 'red', 'fuchsia', 'magenta', 'deeppink', 'orangered', 'tomato', 'hotpink', 'coral', 'darkorange', 'lightsalmon', 'orange', 'lightpink', 'pink', 'gold', 'peachpuff', 'navajowhite', 'moccasin', 'bisque', 'mistyrose', 'blanchedalmond', 'papayawhip', 'lavenderblush', 'seashell', 'cornsilk', 'lemonchiffon', 'floralwhite', 'snow', 'yellow', 'lightyellow', 'ivory', 'white')
 VALID_COLORS_SET = set(VALID_COLORS)
 DEFAULT_TURTLE_SHAPE = 'circle'
 VALID_TURTLE_SHAPES = ('turtle', 'circle')
+PATH_SVG_TEMPLATE = """<path d="{d}" fill="none" stroke="{pen_color}" stroke-width="{pen_width}" stroke-linecap="round" stroke-linejoin="round"/>"""
+# the open path, which is still growing, gets an id so that the DeltaBackend can replace its 'd' attribute
+OPEN_PATH_SVG_TEMPLATE = PATH_SVG_TEMPLATE.replace('<path ', '<path id="{path_id}" ', 1)
 SVG_TEMPLATE = """
-      <svg width="{window_width}" height="{window_height}">
-        <rect width="100%" height="100%" fill="{background_color}"/>
-        {lines}
-        {turtle}
+      <svg id="{svg_id}" xmlns="http://www.w3.org/2000/svg" width="{window_width}" height="{window_height}" viewBox="{view_box}">
+        <rect id="{svg_id}-bg" x="{view_x}" y="{view_y}" width="100%" height="100%" fill="{background_color}"/>
+        <g id="{svg_id}-lines">{lines}</g>
+        <g id="{svg_id}-turtle">{turtle}</g>
       </svg>
     """
-TURTLE_TURTLE_SVG_TEMPLATE = """<g visibility="{visibility}" transform="rotate({degrees},{rotation_x},{rotation_y}) translate({turtle_x}, {turtle_y})">
+TURTLE_TURTLE_SVG_TEMPLATE = """<g visibility="{visibility}" transform="{transform}">
 <path style=" stroke:none;fill-rule:evenodd;fill:{turtle_color};fill-opacity:1;" d="M 18.214844 0.632812 C 16.109375 1.800781 15.011719 4.074219 15.074219 7.132812 L 15.085938 7.652344 L 14.785156 7.496094 C 13.476562 6.824219 11.957031 6.671875 10.40625 7.066406 C 8.46875 7.550781 6.515625 9.15625 4.394531 11.992188 C 3.0625 13.777344 2.679688 14.636719 3.042969 15.027344 L 3.15625 15.152344 L 3.519531 15.152344 C 4.238281 15.152344 4.828125 14.886719 8.1875 13.039062 C 9.386719 12.378906 10.371094 11.839844 10.378906 11.839844 C 10.386719 11.839844 10.355469 11.929688 10.304688 12.035156 C 9.832031 13.09375 9.257812 14.820312 8.96875 16.078125 C 7.914062 20.652344 8.617188 24.53125 11.070312 27.660156 C 11.351562 28.015625 11.363281 27.914062 10.972656 28.382812 C 8.925781 30.84375 7.945312 33.28125 8.238281 35.1875 C 8.289062 35.527344 8.28125 35.523438 8.917969 35.523438 C 10.941406 35.523438 13.074219 34.207031 15.136719 31.6875 C 15.359375 31.417969 15.328125 31.425781 15.5625 31.574219 C 16.292969 32.042969 18.023438 32.964844 18.175781 32.964844 C 18.335938 32.964844 19.941406 32.210938 20.828125 31.71875 C 20.996094 31.625 21.136719 31.554688 21.136719 31.558594 C 21.203125 31.664062 21.898438 32.414062 22.222656 32.730469 C 23.835938 34.300781 25.5625 35.132812 27.582031 35.300781 C 27.90625 35.328125 27.9375 35.308594 28.007812 34.984375 C 28.382812 33.242188 27.625 30.925781 25.863281 28.425781 L 25.542969 27.96875 L 25.699219 27.785156 C 28.945312 23.960938 29.132812 18.699219 26.257812 11.96875 L 26.207031 11.84375 L 27.945312 12.703125 C 31.53125 14.476562 32.316406 14.800781 33.03125 14.800781 C 33.976562 14.800781 33.78125 13.9375 32.472656 12.292969 C 28.519531 7.355469 25.394531 5.925781 21.921875 7.472656 L 21.558594 7.636719 L 21.578125 7.542969 C 21.699219 6.992188 21.761719 5.742188 21.699219 5.164062 C 21.496094 3.296875 20.664062 1.964844 19.003906 0.855469 C 18.480469 0.503906 18.457031 0.5 18.214844 0.632812"/>
 </g>"""
 TURTLE_CIRCLE_SVG_TEMPLATE = """
-      <g visibility="{visibility}" transform="rotate({degrees},{rotation_x},{rotation_y}) translate({turtle_x}, {turtle_y})">
+      <g visibility="{visibility}" transform="{transform}">
         <circle stroke="{turtle_color}" stroke-width="2" fill="transparent" r="5.5" cx="0" cy="0"/>
         <polygon points="0,12 2,9 -2,9" style="fill:{turtle_color};stroke:{turtle_color};stroke-width:2"/>
       </g>
     """
+# script run by the frontend to apply one frame of the DeltaBackend to an already displayed svg
+DELTA_SCRIPT_TEMPLATE = """(function () {{
+  var lines = document.getElementById("{svg_id}-lines");
+  if (!lines) return;
+  {statements}
+}})();"""
+
+
+# commands stored by a Recorder; the number of float arguments of each one is in OP_ARG_COUNTS.
+# string arguments are stored as indexes into Recorder.strings, and OP_POLYLINE is followed by
+# the number of points and then their coordinates.
+OP_SELECT, OP_MOVE, OP_POLYLINE, OP_HEADING, OP_PEN, OP_SPEED, OP_COLOR, OP_WIDTH, OP_SHAPE, OP_VISIBLE, \
+    OP_WRITE, OP_BGCOLOR, OP_CLEAR, OP_ARC = range(14)
+OP_ARG_COUNTS = (1, 2, None, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 2)
+RECORDING_MAGIC = b'TREC'
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct('<4sBIIIII')  # magic, version, width, height, ops, args and strings bytes
 
 
 SPEED_TO_SEC_MAP = {1: 1.5, 2: 0.9, 3: 0.7, 4: 0.5, 5: 0.3, 6: 0.18, 7: 0.12, 8: 0.06, 9: 0.04, 10: 0.02, 11: 0.01, 12: 0.001, 13: 0.0001}
@@ -56,460 +102,1981 @@ def _speedToSec(speed):
     return SPEED_TO_SEC_MAP[speed]
 
 
-turtle_speed = DEFAULT_SPEED
+# helper function that formats 'value', an integer count of units of 10**-digits, as a short decimal
+# number for svg output: 1500 with 3 digits is '1.5' and -5 is '-.005'.
+def _formatFixed(value, digits):
+    if digits == 0:
+        return str(value)
+    sign = '-' if value < 0 else ''
+    whole, fraction = divmod(abs(value), 10 ** digits)
+    if not fraction:
+        return sign + str(whole)
+    fraction = str(fraction).rjust(digits, '0').rstrip('0')
+    return sign + (str(whole) if whole else '') + '.' + fraction
+
+
+# helper function that simplifies the polyline through the points 'first' to 'last' of 'coords'
+# with the Douglas-Peucker algorithm, returning the indexes of the points that are kept.
+# no dropped point is farther than 'tolerance' from the simplified line.
+def _simplifyPolyline(coords, first, last, tolerance):
+    keep = bytearray(last - first + 1)
+    keep[0] = keep[-1] = 1
+    tolerance2 = tolerance * tolerance
+    stack = [(first, last)]
+    while stack:
+        start, end = stack.pop()
+        x0, y0 = coords[2 * start], coords[2 * start + 1]
+        dx, dy = coords[2 * end] - x0, coords[2 * end + 1] - y0
+        length2 = dx * dx + dy * dy
+        farthest, max_distance2 = 0, tolerance2
+        for i in range(start + 1, end):
+            px, py = coords[2 * i] - x0, coords[2 * i + 1] - y0
+            if length2:
+                cross = px * dy - py * dx
+                distance2 = cross * cross / length2
+            else:
+                distance2 = px * px + py * py
+            if distance2 > max_distance2:
+                farthest, max_distance2 = i, distance2
+        if farthest:
+            keep[farthest - first] = 1
+            stack.append((start, farthest))
+            stack.append((farthest, end))
+    return [first + i for i, kept in enumerate(keep) if kept]
+
+
+# helper function for the path data of the points with the given indexes of 'coords', an array('d')
+# of x0, y0, x1, y1..., written with 'digits' decimals; 'arcs' maps the index of each point reached
+# by an arc to its (radius, sweep flag). the data continues from 'last', the quantized point and
+# command at the end of the path data, or starts the path if 'last' is None.
+# returns the path data and the new 'last'.
+def _formatPath(coords, arcs, indexes, last, digits):
+    scale = 10 ** digits
+    parts = []
+    for i in indexes:
+        x = round(coords[2 * i] * scale)
+        y = round(coords[2 * i + 1] * scale)
+        if last is None:
+            parts.append('M' + _formatFixed(x, digits) + ' ' + _formatFixed(y, digits))
+            command = 'M'
+        else:
+            delta = _formatFixed(x - last[0], digits) + ' ' + _formatFixed(y - last[1], digits)
+            command = last[2]
+            if i in arcs:
+                radius, sweep = arcs[i]
+                radius = _formatFixed(round(radius * scale), digits)
+                parts.append('a' + radius + ' ' + radius + ' 0 0 ' + str(sweep) + ' ' + delta)
+                command = 'a'
+            elif command == 'l':
+                parts.append(' ' + delta)
+            else:
+                parts.append('l' + delta)
+                command = 'l'
+        last = (x, y, command)
+    return ''.join(parts), last
+
+
+# append-only store for the svg primitives of the drawing.
+# consecutive pen-down moves with the same pen color and width are merged into a single <path>,
+# and serialization is cached so each render only formats what was added since the previous one.
+# path coordinates are written with 'precision' decimal digits, as relative moves ('l dx dy') or,
+# for circular arcs, as relative svg arc commands ('a r r 0 0 sweep dx dy');
+# with a 'tolerance' greater than 0, paths are simplified so that no point of the drawing moves
+# farther than 'tolerance' from where it was drawn. Both settings apply to paths drawn after they change.
+# the bounding box of every primitive is kept in a grid of GRID_CELL sized cells, so that the
+# primitives inside a view can be serialized without looking at the rest of the drawing.
+class _DrawingBuffer:
+    __slots__ = ('items', 'items_svg', 'cached_items', 'precision', 'tolerance',
+                 'path_style', 'path_coords', 'path_arcs', 'path_data', 'cached_points', 'cached_last',
+                 'boxes', 'grid', 'large_items', 'bounds')
+
+    def __init__(self, precision=DEFAULT_PRECISION, tolerance=0):
+        self.items = []  # serialized primitives, not including the open path
+        self.items_svg = ''  # cache of ''.join(items[:cached_items])
+        self.cached_items = 0
+        self.boxes = array('d')  # x0, y0, x1, y1 of the bounding box of each item
+        self.grid = {}  # (column, row) of a cell: indexes of the items whose box overlaps it
+        self.large_items = []  # indexes of the items too large for the grid
+        self.bounds = None  # bounding box of all items
+        self.precision = precision
+        self.tolerance = tolerance
+        self.path_style = None  # (pen_color, pen_width) of the open path, None if there is no open path
+        self.path_coords = array('d')  # x0, y0, x1, y1... of the open path
+        self.path_arcs = {}  # index of each point of the open path reached by an arc: (radius, sweep flag)
+        self._resetPathCache()
+
+    def _resetPathCache(self):
+        self.path_data = ''  # cache of the 'd' attribute for the points before cached_points
+        self.cached_points = 0
+        self.cached_last = None  # quantized coordinates of the last point in path_data, and its command
+
+    # add a straight line from 'start' to 'end', extending the open path when possible
+    def line(self, start, end, pen_color, pen_width):
+        coords = self._pathFrom(start, pen_color, pen_width)
+        coords.append(end[0])
+        coords.append(end[1])
+
+    # add connected lines from 'start' through the points in 'coords', an array('d') of x0, y0, x1, y1...
+    def polyline(self, start, coords, pen_color, pen_width):
+        i = 0
+        while i < len(coords):
+            path = self._pathFrom(start, pen_color, pen_width)
+            end = i + 2 * PATH_SPLIT_POINTS - len(path)
+            path.extend(coords[i:end])
+            start = path[-2], path[-1]
+            i = end
+
+    # add a circular arc of 'radius' from 'start' to 'end'; 'sweep' is 1 if it turns clockwise.
+    # the arc must not be longer than half a circle.
+    def arc(self, start, end, radius, sweep, pen_color, pen_width):
+        coords = self._pathFrom(start, pen_color, pen_width)
+        self.path_arcs[len(coords) // 2] = (abs(radius), sweep)
+        coords.append(end[0])
+        coords.append(end[1])
+
+    # coordinates of the open path, after starting a new one unless it ends at 'start' with the same pen
+    # and has room for more points
+    def _pathFrom(self, start, pen_color, pen_width):
+        coords = self.path_coords
+        if (self.path_style != (pen_color, pen_width) or coords[-2] != start[0] or coords[-1] != start[1]
+                or len(coords) >= 2 * PATH_SPLIT_POINTS):
+            self.closePath()
+            coords = self.path_coords
+            self.path_style = (pen_color, pen_width)
+            coords.append(start[0])
+            coords.append(start[1])
+        return coords
+
+    # add an already serialized primitive, such as a <text> element, covering 'box' (x0, y0, x1, y1)
+    def append(self, svg, box):
+        self.closePath()
+        self._addItem(svg, box)
+
+    # finish the open path, so that the next line starts a new one
+    def closePath(self):
+        if self.path_style is None:
+            return
+        self._addItem(self.pathSvg(), self._pathBox())
+        self.path_style = None
+        self.path_coords = array('d')
+        self.path_arcs = {}
+        self._resetPathCache()
+
+    def clear(self):
+        self.__init__(self.precision, self.tolerance)
+
+    # store a serialized primitive and add its bounding box to the spatial index
+    def _addItem(self, svg, box):
+        index = len(self.items)
+        self.items.append(svg)
+        self.boxes.extend(box)
+        x0, y0, x1, y1 = box
+        if self.bounds is None:
+            self.bounds = box
+        else:
+            bounds = self.bounds
+            self.bounds = (min(bounds[0], x0), min(bounds[1], y0), max(bounds[2], x1), max(bounds[3], y1))
+
+        columns = range(int(x0 // GRID_CELL), int(x1 // GRID_CELL) + 1)
+        rows = range(int(y0 // GRID_CELL), int(y1 // GRID_CELL) + 1)
+        if len(columns) * len(rows) > LARGE_ITEM_CELLS:
+            self.large_items.append(index)
+            return
+        grid = self.grid
+        for column in columns:
+            for row in rows:
+                cell = grid.get((column, row))
+                if cell is None:
+                    grid[column, row] = [index]
+                else:
+                    cell.append(index)
+
+    # bounding box of the open path, including the bulge of its arcs and half the pen width
+    def _pathBox(self):
+        coords = self.path_coords
+        xs = coords[0::2]
+        ys = coords[1::2]
+        margin = self.path_style[1] / 2
+        if self.path_arcs:
+            margin += max(radius for radius, _ in self.path_arcs.values())
+        return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+    # whether item 'index' overlaps 'area', a box of x0, y0, x1, y1
+    def isVisible(self, index, area):
+        boxes = self.boxes
+        i = 4 * index
+        return boxes[i] <= area[2] and boxes[i + 2] >= area[0] and boxes[i + 1] <= area[3] and boxes[i + 3] >= area[1]
+
+    # whether every item of the drawing is inside 'area'
+    def isInside(self, area):
+        bounds = self.bounds
+        return (bounds is None or area[0] <= bounds[0] and area[1] <= bounds[1]
+                and area[2] >= bounds[2] and area[3] >= bounds[3])
+
+    # sorted indexes of the items that overlap 'area', found through the grid cells it covers
+    def visibleItems(self, area):
+        if self.bounds is None:
+            return []
+        # only the cells inside the drawing can hold items
+        x0, y0 = max(area[0], self.bounds[0]), max(area[1], self.bounds[1])
+        x1, y1 = min(area[2], self.bounds[2]), min(area[3], self.bounds[3])
+        if x0 > x1 or y0 > y1:
+            return []
+        candidates = set(self.large_items)
+        grid = self.grid
+        for column in range(int(x0 // GRID_CELL), int(x1 // GRID_CELL) + 1):
+            for row in range(int(y0 // GRID_CELL), int(y1 // GRID_CELL) + 1):
+                cell = grid.get((column, row))
+                if cell is not None:
+                    candidates.update(cell)
+        return sorted(i for i in candidates if self.isVisible(i, area))
+
+    # change the output precision or simplification tolerance of the paths drawn from now on
+    def configure(self, precision=None, tolerance=None):
+        self.closePath()
+        if precision is not None:
+            self.precision = precision
+        if tolerance is not None:
+            self.tolerance = tolerance
+
+    # helper function for the path data of the points of the open path with the given indexes, see _formatPath()
+    def _formatPoints(self, indexes, last):
+        return _formatPath(self.path_coords, self.path_arcs, indexes, last, self.precision)
+
+    # helper function for the indexes of the points from 'first' to 'last' that are written,
+    # leaving out 'first' when it was already written as the end of the cached path data.
+    # simplification never removes the ends of an arc.
+    def _pointIndexes(self, first, last):
+        if self.tolerance:
+            indexes = []
+            start = first
+            for arc_end in sorted(i for i in self.path_arcs if first < i <= last):
+                indexes.extend(_simplifyPolyline(self.path_coords, start, arc_end - 1, self.tolerance))
+                start = arc_end
+            indexes.extend(_simplifyPolyline(self.path_coords, start, last, self.tolerance))
+        else:
+            indexes = range(first, last + 1)
+        if self.cached_points:
+            return indexes[1:]
+        return indexes
+
+    # 'd' attribute of the open path
+    def pathData(self):
+        points = len(self.path_coords) // 2
+        # cache whole chunks of points; when simplifying, the points after the last full chunk are
+        # simplified again on every call, since later points may still change which ones are kept
+        chunk = SIMPLIFY_CHUNK if self.tolerance else max(points - self.cached_points, 1)
+        while points - self.cached_points >= chunk:
+            first = max(self.cached_points - 1, 0)
+            last = min(first + chunk, points - 1)
+            data, self.cached_last = self._formatPoints(self._pointIndexes(first, last), self.cached_last)
+            self.path_data += data
+            self.cached_points = last + 1
+
+        data = self.path_data
+        if self.cached_points < points:
+            data += self._formatPoints(self._pointIndexes(max(self.cached_points - 1, 0), points - 1), self.cached_last)[0]
+        return data
+
+    # the open path as an svg element, with 'path_id' as its id if it is given
+    def pathSvg(self, path_id=None):
+        if self.path_style is None:
+            return ''
+        pen_color, pen_width = self.path_style
+        if path_id is None:
+            return PATH_SVG_TEMPLATE.format(d=self.pathData(), pen_color=pen_color, pen_width=pen_width)
+        return OPEN_PATH_SVG_TEMPLATE.format(path_id=path_id, d=self.pathData(), pen_color=pen_color, pen_width=pen_width)
+
+    # serialize the finished primitives that overlap 'area', a box of x0, y0, x1, y1, or all of them if it is None,
+    # leaving out those after the first 'count'. the whole drawing reuses the cached output of the previous call.
+    def itemsSvg(self, area=None, count=None):
+        items = self.items
+        if area is not None and not self.isInside(area):
+            visible = self.visibleItems(area)
+            if count is not None:
+                visible = [i for i in visible if i < count]
+            return ''.join([items[i] for i in visible])
+        if count is not None and count < len(items):
+            return ''.join(items[:count])
+        if self.cached_items < len(self.items):
+            self.items_svg += ''.join(self.items[self.cached_items:])
+            self.cached_items = len(self.items)
+        return self.items_svg
+
+    # serialize the primitives that overlap 'area' as itemsSvg() does, followed by the open path,
+    # which is always included, with 'path_id' as its id if it is given
+    def svg(self, area=None, path_id=None):
+        return self.itemsSvg(area) + self.pathSvg(path_id)
 
-is_turtle_visible = DEFAULT_TURTLE_VISIBILITY
-pen_color = DEFAULT_PEN_COLOR
-window_size = DEFAULT_WINDOW_SIZE
-turtle_pos = (DEFAULT_WINDOW_SIZE[0] // 2, DEFAULT_WINDOW_SIZE[1] // 2)
-turtle_degree = DEFAULT_TURTLE_DEGREE
-background_color = DEFAULT_BACKGROUND_COLOR
-is_pen_down = DEFAULT_IS_PEN_DOWN
-svg_lines_string = DEFAULT_SVG_LINES_STRING
-pen_width = DEFAULT_PEN_WIDTH
-turtle_shape = DEFAULT_TURTLE_SHAPE
 
-drawing_window = None
+def _validateColorString(color):
+    if color in VALID_COLORS_SET: # 140 predefined html color names
+        return True
+    if re.search(r"^#(?:[0-9a-fA-F]{3}){1,2}$", color): # 3 or 6 digit hex color code
+        return True
+    if re.search(r"rgb\(\s*(?:(?:\d{1,2}|1\d\d|2(?:[0-4]\d|5[0-5]))\s*,?){3}\)$", color): # rgb color code
+        return True
+    return False
 
+def _validateColorTuple(color):
+    if len(color) != 3:
+        return False
+    if not isinstance(color[0], int) or not isinstance(color[1], int) or not isinstance(color[2], int):
+        return False
+    if not 0 <= color[0] <= 255 or not 0 <= color[1] <= 255 or not 0 <= color[2] <= 255:
+        return False
+    return True
 
-# construct the display for turtle
-def make_turtle(speed=DEFAULT_SPEED, width=DEFAULT_WINDOW_SIZE[0], height=DEFAULT_WINDOW_SIZE[1]):
-    global window_size
-    global drawing_window
-    global turtle_speed
-    global is_turtle_visible
-    global pen_color
-    global turtle_color
-    global turtle_pos
-    global turtle_degree
-    global background_color
-    global is_pen_down
-    global svg_lines_string
-    global pen_width
-    global turtle_shape
+def _processColor(color):
+    if isinstance(color, str):
+        color = color.lower()
+        if not _validateColorString(color):
+            raise ValueError('color is invalid. it can be a known html color name, 3-6 digit hex string or rgb string.')
+        return color
+    elif isinstance(color, tuple):
+        if not _validateColorTuple(color):
+            raise ValueError('color tuple is invalid. it must be a tuple of three integers, which are in the interval [0,255]')
+        return 'rgb(' + str(color[0]) + ',' + str(color[1]) + ',' + str(color[2]) + ')'
+    else:
+        raise ValueError('the first parameter must be a color string or a tuple')
 
-    if isinstance(speed,int) == False or speed not in range(1, 14):
-        raise ValueError('speed must be an integer in interval [1,13]')
-    turtle_speed = speed
-
-    window_size = width, height
-    if not (isinstance(window_size, tuple) and
-            isinstance(window_size[0], int) and
-            isinstance(window_size[1], int)):
-        raise ValueError('window_size must be a tuple of 2 integers')
-
-    is_turtle_visible = DEFAULT_TURTLE_VISIBILITY
-    pen_color = DEFAULT_PEN_COLOR
-    turtle_color = DEFAULT_TURTLE_COLOR
-    turtle_pos = (window_size[0] // 2, window_size[1] // 2)
-    turtle_degree = DEFAULT_TURTLE_DEGREE
-    background_color = DEFAULT_BACKGROUND_COLOR
-    is_pen_down = DEFAULT_IS_PEN_DOWN
-    svg_lines_string = DEFAULT_SVG_LINES_STRING
-    pen_width = DEFAULT_PEN_WIDTH
-    turtle_shape = DEFAULT_TURTLE_SHAPE
-
-    drawing_window = display(HTML(_generateSvgDrawing()), display_id=True)
-
-
-# helper function for generating svg string of the turtle
-def _generateTurtleSvgDrawing():
-    if is_turtle_visible:
+
+# helper function that computes all points of a walk() at once with numpy, rounded to 'digits' decimals.
+# returns the coordinates as an array('d') of x0, y0, x1, y1... and the final heading.
+def _walkPointsNumpy(np, start, degree, lengths, turns, headings, digits=DEFAULT_PRECISION):
+    if headings is not None:
+        lengths, degrees = np.broadcast_arrays(np.atleast_1d(np.asarray(lengths, dtype=float)),
+                                               np.asarray(headings, dtype=float) % 360)
+    elif turns is not None:
+        lengths, turns = np.broadcast_arrays(np.atleast_1d(np.asarray(lengths, dtype=float)),
+                                             np.asarray(turns, dtype=float))
+        degrees = (degree - np.cumsum(turns)) % 360
+    else:
+        lengths = np.atleast_1d(np.asarray(lengths, dtype=float))
+        degrees = np.full(lengths.shape, degree % 360)
+    if lengths.ndim != 1:
+        raise ValueError('lengths, turns and headings must be numbers or one-dimensional sequences.')
+    if len(lengths) == 0:
+        return array('d'), degree
+
+    radians = np.radians(degrees)
+    points = np.empty((len(lengths), 2))
+    points[:, 0] = start[0] + np.cumsum(lengths * np.cos(radians))
+    points[:, 1] = start[1] + np.cumsum(lengths * np.sin(radians))
+    # rounding the points to eliminate floating point errors.
+    return array('d', np.round(points, digits).tobytes()), float(degrees[-1])
+
+
+# helper function that computes all points of a walk() in plain python, used when numpy is not installed
+def _walkPointsPython(start, degree, lengths, turns, headings, digits=DEFAULT_PRECISION):
+    columns = [lengths, turns if headings is None else headings]
+    sizes = {len(c) for c in columns if c is not None and not isinstance(c, (int, float))}
+    if len(sizes) > 1:
+        raise ValueError('lengths, turns and headings must have the same length.')
+    size = sizes.pop() if sizes else 1
+    lengths, angles = [itertools.repeat(c, size) if c is None or isinstance(c, (int, float)) else c for c in columns]
+
+    if headings is not None:
+        degrees = [h % 360 for h in angles]
+    elif turns is not None:
+        degrees = [(degree - turned) % 360 for turned in itertools.accumulate(angles)]
+    else:
+        degrees = [degree % 360] * size
+    if not degrees:
+        return array('d'), degree
+
+    coords = array('d')
+    x, y = start
+    for units, deg in zip(lengths, degrees):
+        alpha = math.radians(deg)
+        x += units * math.cos(alpha)
+        y += units * math.sin(alpha)
+        # rounding the points to eliminate floating point errors.
+        coords.append(round(x, digits))
+        coords.append(round(y, digits))
+    return coords, degrees[-1]
+
+
+# helper function that returns a new id for the svg element of a display
+def _newSvgId():
+    return 'turtle-' + uuid.uuid4().hex[:12]
+
+
+# helper function for generating the svg string of a turtle with the given look, see Turtle._look()
+def _turtleSvg(look, transform):
+    shape, turtle_color, visible = look
+    if visible:
         vis = 'visible'
     else:
         vis = 'hidden'
 
-    turtle_x = turtle_pos[0]
-    turtle_y = turtle_pos[1]
-    degrees = turtle_degree
-    template = ''
-
-    if turtle_shape == 'turtle':
-        turtle_x -= 18
-        turtle_y -= 18
-        degrees += 90
+    if shape == 'turtle':
         template = TURTLE_TURTLE_SVG_TEMPLATE
     else: #circle
-        degrees -= 90
         template = TURTLE_CIRCLE_SVG_TEMPLATE
 
-    return template.format(turtle_color=turtle_color, turtle_x=turtle_x, turtle_y=turtle_y, \
-                                      visibility=vis, degrees=degrees, rotation_x=turtle_pos[0], rotation_y=turtle_pos[1])
+    return template.format(turtle_color=turtle_color, visibility=vis, transform=transform)
+
+
+# the state of a canvas at one frame, which a backend renders only when the frame is shown, see Animator.
+# primitives are only ever appended to the items list of the drawing and points to the coordinates
+# of its open path, and both are replaced by new objects when the drawing is cleared or the path is
+# finished; so references to them and their lengths are enough to show the drawing as it was.
+class _Frame:
+    __slots__ = ('items', 'item_count', 'path_style', 'path_coords', 'path_arcs', 'path_points', 'precision',
+                 'background_color', 'view', 'turtles')
+
+    def __init__(self, canvas):
+        buffer = canvas.buffer
+        self.items = buffer.items
+        self.item_count = len(buffer.items)
+        self.path_style = buffer.path_style
+        self.path_coords = buffer.path_coords
+        self.path_arcs = buffer.path_arcs
+        self.path_points = len(buffer.path_coords) // 2
+        self.precision = buffer.precision
+        self.background_color = canvas.background_color
+        self.view = canvas.view
+        self.turtles = [(t._look(), t._generateTransform()) for t in canvas.turtles]
+
+    # the view as a box of x0, y0, x1, y1
+    def viewArea(self):
+        x, y, width, height = self.view
+        return x, y, x + width, y + height
+
+    # path data of the points of the open path from 'first' on, continuing from 'last' as in _formatPath().
+    # the open path is not simplified; it is when it is finished and added to the items.
+    def pathData(self, first=0, last=None):
+        return _formatPath(self.path_coords, self.path_arcs, range(first, self.path_points), last, self.precision)
+
+    # the open path as an svg element with the id 'path_id'
+    def pathSvg(self, path_id):
+        if self.path_style is None:
+            return ''
+        pen_color, pen_width = self.path_style
+        return OPEN_PATH_SVG_TEMPLATE.format(path_id=path_id, d=self.pathData()[0], pen_color=pen_color, pen_width=pen_width)
+
+    def turtlesSvg(self):
+        return ''.join(_turtleSvg(look, transform) for look, transform in self.turtles)
+
+
+# headless backend that only records the drawing, for use in scripts, tests and batch jobs.
+# nothing is displayed and moves are not animated; if 'filename' is given, the drawing is
+# written to that svg file whenever update() is called. save() works with any backend.
+class SVGBackend:
+    animated = False
+
+    def __init__(self, filename=None):
+        self.svg_id = _newSvgId()
+        self.filename = filename
+        self.canvas = None
+
+    def show(self, canvas):
+        self.canvas = canvas
+
+    def update(self):
+        pass
+
+    def flush(self):
+        if self.filename is not None:
+            svg = self.canvas._generateSvgDrawing(self.svg_id)
+            _writeSvg(self.filename, svg)
+            self.canvas._countFrame(len(svg))
+
+    # frames are not kept, since there is nothing to animate; sending any of them writes the file
+    def frame(self):
+        return None
+
+    def send(self, frame):
+        self.flush()
+
+    def merge(self, first, second):
+        return None
+
+    def redraw(self):
+        self.flush()
+
+    def close(self):
+        pass
+
+
+# backend that shows the drawing in an html output, sending the whole svg document on every frame
+class HTMLBackend:
+    animated = True
+
+    def __init__(self):
+        self.svg_id = _newSvgId()
+        self.canvas = None
+        self.handle = None
+
+    # create the notebook output for the drawing of 'canvas'
+    def show(self, canvas):
+        from IPython.display import display, HTML
+
+        self.canvas = canvas
+        svg = canvas._generateSvgDrawing(self.svg_id)
+        self.handle = display(HTML(svg), display_id=True)
+        canvas._countFrame(len(svg))
+
+    # render a frame for the latest move
+    def update(self):
+        self.flush()
+
+    # render the current drawing right away
+    def flush(self):
+        self.send(None)
+
+    # the current state of the drawing, which send() can show later, see Animator
+    def frame(self):
+        return _Frame(self.canvas)
+
+    # show the drawing as it was at a frame made by frame(), or as it is now if 'frame' is None
+    def send(self, frame):
+        from IPython.display import HTML
+
+        svg = self.canvas._generateSvgDrawing(self.svg_id, frame)
+        self.handle.update(HTML(svg))
+        self.canvas._countFrame(len(svg))
+
+    # a single frame with the effect of showing 'first' and then 'second'
+    def merge(self, first, second):
+        return second
+
+    # show the current drawing, replacing whatever frames were sent before
+    def redraw(self):
+        self.flush()
+
+    # stop updating the notebook output
+    def close(self):
+        self.handle = None
+
+
+# backend that shows the svg document once and then sends only the primitives added since
+# the previous frame, plus the turtle position, to a small script that patches the displayed svg.
+# the open path, which grows with every move, is sent as an element whose 'd' attribute is extended
+# in each frame until the path is finished.
+# frames are sent at most 'fps' times per second; moves that fall inside a single frame interval
+# are merged into the next frame. Primitives outside the view are not sent; after a zoom or pan the
+# primitives inside the new view replace the displayed ones. At the end of each notebook cell the
+# whole document is rendered once more, so the saved notebook shows the complete drawing.
+class DeltaBackend:
+    animated = True
+
+    def __init__(self, fps=DEFAULT_FPS):
+        if not isinstance(fps, (int, float)) or not fps > 0:
+            raise ValueError('fps must be a positive number.')
+        self.svg_id = _newSvgId()
+        self.frame_interval = 1 / fps
+        self.canvas = None
+        self.handle = None
+        self.script_handle = None
+        self.shell = None
+        self.last_frame_time = 0.0
+        self.pending = False  # moves were made since the last frame
+        self.dirty = False  # frames were sent since the last full render
+        self.sent_items = None  # canvas.buffer.items list mirrored by the frontend
+        self.sent_count = 0
+        self.sent_path = None  # path_coords of the open path shown by the frontend, None if there is none
+        self.sent_points = 0  # points of that path that were sent
+        self.sent_last = None  # quantized last point and command of its path data, see _formatPath()
+        self.sent_background = None
+        self.sent_view = None
+        self.sent_turtles = None  # shape, color and visibility of each turtle
+
+    # create the notebook output for the drawing of 'canvas'
+    def show(self, canvas):
+        from IPython import get_ipython
+        from IPython.display import display, HTML
+
+        self.canvas = canvas
+        svg = self._render()
+        self.handle = display(HTML(svg), display_id=True)
+        canvas._countFrame(len(svg))
+        self.script_handle = display(HTML(''), display_id=True)
+        self.shell = get_ipython()
+        if self.shell is not None:
+            self.shell.events.register('post_run_cell', self._cellFinished)
+
+    # render a frame for the latest move, unless the previous frame is too recent
+    def update(self):
+        if time.monotonic() - self.last_frame_time < self.frame_interval:
+            self.pending = True
+            return
+        self.flush()
+
+    # send the changes since the previous frame right away
+    def flush(self):
+        self.send(self.frame())
+
+    # the current state of the drawing, which send() can show later, see Animator.
+    # frames must be sent in the order they were made.
+    def frame(self):
+        return _Frame(self.canvas)
+
+    # apply the changes from the drawing that was sent last to the one of 'frame', a frame made by frame()
+    def send(self, frame):
+        from IPython.display import Javascript
+
+        script = DELTA_SCRIPT_TEMPLATE.format(svg_id=self.svg_id, statements='\n  '.join(self._statements(frame)))
+        self.script_handle.update(Javascript(script))
+        self.canvas._countFrame(len(script))
+        self.last_frame_time = time.monotonic()
+        self.pending = False
+        self.dirty = True
+
+    # a single frame with the effect of applying 'first' and then 'second'; since every frame is
+    # applied to the drawing that was sent last, that is 'second'
+    def merge(self, first, second):
+        return second
+
+    # render the whole document again, replacing the frames sent before
+    def redraw(self):
+        from IPython.display import HTML
+
+        svg = self._render()
+        self.handle.update(HTML(svg))
+        self.script_handle.update(HTML(''))
+        self.canvas._countFrame(len(svg))
+
+    # stop updating the notebook output
+    def close(self):
+        if self.shell is not None:
+            self.shell.events.unregister('post_run_cell', self._cellFinished)
+            self.shell = None
+
+    # script statements that bring the displayed svg from the drawing sent last to the one of 'frame'
+    def _statements(self, frame):
+        buffer = self.canvas.buffer
+        items = frame.items
+        count = frame.item_count
+        area = frame.viewArea()
+        # the bounding boxes of the items are only known while they are still in the drawing
+        culled = items is buffer.items and not buffer.isInside(area)
+        path_id = json.dumps(self.svg_id + '-path')
+        statements = []
+        if frame.view != self.sent_view:  # zoomed or panned: replace everything with the new view
+            x, y, width, height = frame.view
+            statements.append('document.getElementById("{svg_id}").setAttribute("viewBox", {view_box});'.format(
+                svg_id=self.svg_id, view_box=json.dumps(self.canvas._viewBoxString(frame.view))))
+            statements.append('document.getElementById("{svg_id}-bg").setAttribute("x", {x});'.format(
+                svg_id=self.svg_id, x=json.dumps(x)))
+            statements.append('document.getElementById("{svg_id}-bg").setAttribute("y", {y});'.format(
+                svg_id=self.svg_id, y=json.dumps(y)))
+            svg = buffer.itemsSvg(area, count) if items is buffer.items else ''.join(items[:count])
+            statements.append('lines.innerHTML = {svg};'.format(svg=json.dumps(svg)))
+            self.sent_view = frame.view
+            self.sent_items = items
+            self.sent_count = count
+            self.sent_path = None
+        elif items is not self.sent_items:  # the drawing was cleared
+            statements.append('lines.innerHTML = "";')
+            self.sent_items = items
+            self.sent_count = 0
+            self.sent_path = None
+        if self.sent_count < count:
+            # the open path that was sent is finished now, and it is sent again among the new items
+            if self.sent_path is not None:
+                statements.append('document.getElementById({path_id}).remove();'.format(path_id=path_id))
+                self.sent_path = None
+            new_items = range(self.sent_count, count)
+            if culled:
+                new_items = [i for i in new_items if buffer.isVisible(i, area)]
+            if new_items:
+                statements.append('lines.insertAdjacentHTML("beforeend", {svg});'.format(
+                    svg=json.dumps(''.join([items[i] for i in new_items]))))
+            self.sent_count = count
+        if frame.path_style is not None:
+            if frame.path_coords is not self.sent_path:  # a new path: send it whole
+                data, self.sent_last = frame.pathData()
+                pen_color, pen_width = frame.path_style
+                statements.append('lines.insertAdjacentHTML("beforeend", {svg});'.format(
+                    svg=json.dumps(OPEN_PATH_SVG_TEMPLATE.format(
+                        path_id=self.svg_id + '-path', d=data, pen_color=pen_color, pen_width=pen_width))))
+            elif self.sent_points < frame.path_points:  # the same path with more points: send only those
+                data, self.sent_last = frame.pathData(self.sent_points, self.sent_last)
+                statements.append('var path = document.getElementById({path_id});'.format(path_id=path_id))
+                statements.append('path.setAttribute("d", path.getAttribute("d") + {data});'.format(
+                    data=json.dumps(data)))
+            self.sent_path = frame.path_coords
+            self.sent_points = frame.path_points
+        if frame.background_color != self.sent_background:
+            statements.append('document.getElementById("{svg_id}-bg").setAttribute("fill", {color});'.format(
+                svg_id=self.svg_id, color=json.dumps(frame.background_color)))
+            self.sent_background = frame.background_color
+        statements.extend(self._turtleStatements(frame))
+        return statements
+
+    # script statements that move the turtles, or redraw them all if the shape, color
+    # or visibility of any turtle changed
+    def _turtleStatements(self, frame):
+        looks = [look for look, _ in frame.turtles]
+        if looks != self.sent_turtles:
+            self.sent_turtles = looks
+            return ['document.getElementById("{svg_id}-turtle").innerHTML = {svg};'.format(
+                svg_id=self.svg_id, svg=json.dumps(frame.turtlesSvg()))]
+        statements = ['var turtles = document.getElementById("{svg_id}-turtle").children;'.format(svg_id=self.svg_id)]
+        for i, (_, transform) in enumerate(frame.turtles):
+            statements.append('turtles[{i}].setAttribute("transform", {transform});'.format(
+                i=i, transform=json.dumps(transform)))
+        return statements
+
+    # whole svg document, recording that the frontend is now in sync with it
+    def _render(self):
+        canvas = self.canvas
+        buffer = canvas.buffer
+        self.sent_items = buffer.items
+        self.sent_count = len(buffer.items)
+        self.sent_path = None
+        if buffer.path_style is not None:
+            # the path data of the document may be simplified, but it always ends at the last point
+            digits = buffer.precision
+            coords = buffer.path_coords
+            self.sent_path = coords
+            self.sent_points = len(coords) // 2
+            self.sent_last = (round(coords[-2] * 10 ** digits), round(coords[-1] * 10 ** digits), None)
+        self.sent_background = canvas.background_color
+        self.sent_view = canvas.view
+        self.sent_turtles = [t._look() for t in canvas.turtles]
+        self.last_frame_time = time.monotonic()
+        self.pending = False
+        self.dirty = False
+        return canvas._generateSvgDrawing(self.svg_id)
+
+    # replace the patched svg with a full render, so the notebook is saved with the complete drawing.
+    # while an 'async' animation is playing, its animator does this when it finishes instead.
+    def _cellFinished(self, *args):
+        animator = self.canvas.animator
+        if animator is not None and animator.isPlaying():
+            return
+        if self.pending or self.dirty:
+            self.redraw()
+
+
+BACKENDS = {'html': HTMLBackend, 'delta': DeltaBackend, 'svg': SVGBackend}
+
+
+# player of the frames of a canvas in 'async' animation mode, see Canvas.animation().
+# moves are drawn right away and each frame is queued with the delay of the turtle speed;
+# a task on the running asyncio event loop (the notebook kernel's) shows them one by one
+# while the user's code goes on. A queued frame only keeps the lengths of the drawing and the
+# turtle positions (see _Frame); the backend renders it when it is shown. Frames that come faster
+# than the backend's frame interval, or that do not fit in the queue, are merged into the last queued frame.
+class Animator:
+    __slots__ = ('backend', 'frames', 'task', 'max_frames')
+
+    def __init__(self, backend, max_frames=MAX_QUEUED_FRAMES):
+        asyncio.get_running_loop()  # raises RuntimeError when there is no loop to play the frames
+        self.backend = backend
+        self.frames = collections.deque()  # [delay, frame] pairs waiting to be shown
+        self.task = None
+        self.max_frames = max_frames
+
+    # queue a frame of the current drawing, shown 'delay' seconds after the previous one
+    def add(self, delay):
+        backend = self.backend
+        frame = backend.frame()
+        frames = self.frames
+        if frames and frames[-1][0] < getattr(backend, 'frame_interval', 0):
+            frames[-1][0] += delay
+            frames[-1][1] = backend.merge(frames[-1][1], frame)
+        elif len(frames) >= self.max_frames:
+            frames[-1][1] = backend.merge(frames[-1][1], frame)
+        else:
+            frames.append([delay, frame])
+        if not self.isPlaying():
+            self.task = asyncio.get_running_loop().create_task(self._play())
+
+    # whether there are frames left to show
+    def isPlaying(self):
+        return self.task is not None and not self.task.done()
+
+    async def _play(self):
+        frames = self.frames
+        while frames:
+            delay, frame = frames.popleft()
+            await asyncio.sleep(delay)
+            self.backend.send(frame)
+        self.backend.redraw()
+
+    # drop the queued frames and show the final drawing right away
+    def skip(self):
+        self.stop()
+        self.backend.redraw()
+
+    # drop the queued frames and stop playing, leaving the display as it is
+    def stop(self):
+        self.frames.clear()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+# helper function for writing an svg document to a file
+def _writeSvg(filename, svg):
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(svg.strip() + '\n')
+
+
+# helper function for converting an svg document to a png file, using cairosvg or rsvg-convert
+def _writePng(filename, svg):
+    try:
+        import cairosvg
+    except ImportError:
+        cairosvg = None
+    if cairosvg is not None:
+        cairosvg.svg2png(bytestring=svg.encode('utf-8'), write_to=filename)
+    elif shutil.which('rsvg-convert'):
+        subprocess.run(['rsvg-convert', '--format', 'png', '--output', filename],
+                       input=svg.encode('utf-8'), check=True)
+    else:
+        raise RuntimeError('saving png files requires the cairosvg package or the rsvg-convert program.')
+
+
+# compact log of the commands given to the turtles of a canvas, see Canvas.record().
+# commands are kept in arrays: one byte per command in 'ops' and their arguments as doubles in 'args',
+# with positions stored as absolute coordinates so a replay does not depend on the code that made them.
+class Recorder:
+    __slots__ = ('window_size', 'ops', 'args', 'strings', 'string_indexes', 'turtles', 'current_turtle')
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self.ops = array('B')
+        self.args = array('d')
+        self.strings = []
+        self.string_indexes = {}
+        self.turtles = []  # turtles seen while recording, a command's turtle is selected by its index here
+        self.current_turtle = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    # store command 'op' with its 'args', switching to 'turtle' first unless it is a canvas command
+    def add(self, turtle, op, args=()):
+        if turtle is not None and turtle is not self.current_turtle:
+            self._select(turtle)
+        self.ops.append(op)
+        for arg in args:
+            if isinstance(arg, str):
+                arg = self._stringIndex(arg)
+            self.args.append(arg)
+
+    # store an OP_POLYLINE through the points in 'coords', an array('d') of x0, y0, x1, y1...
+    def addPolyline(self, turtle, coords):
+        self.add(turtle, OP_POLYLINE, (len(coords) // 2,))
+        self.args.extend(coords)
+
+    def _stringIndex(self, text):
+        index = self.string_indexes.get(text)
+        if index is None:
+            index = self.string_indexes[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    # select 'turtle' for the following commands; the first time, also store its current state
+    def _select(self, turtle):
+        self.current_turtle = turtle
+        if turtle in self.turtles:
+            self.ops.append(OP_SELECT)
+            self.args.append(self.turtles.index(turtle))
+            return
+        self.turtles.append(turtle)
+        self.add(turtle, OP_SELECT, (len(self.turtles) - 1,))
+        self.add(turtle, OP_SPEED, (turtle.turtle_speed,))
+        self.add(turtle, OP_SHAPE, (turtle.turtle_shape,))
+        self.add(turtle, OP_VISIBLE, (turtle.is_turtle_visible,))
+        self.add(turtle, OP_COLOR, (turtle.pen_color,))
+        self.add(turtle, OP_WIDTH, (turtle.pen_width,))
+        self.add(turtle, OP_PEN, (False,))
+        self.add(turtle, OP_MOVE, turtle.turtle_pos)
+        self.add(turtle, OP_HEADING, (turtle.turtle_degree,))
+        self.add(turtle, OP_PEN, (turtle.is_pen_down,))
+
+    # write the recording to a compressed binary file
+    def save(self, filename):
+        args = array('d', self.args)
+        if sys.byteorder == 'big':
+            args.byteswap()
+        strings = json.dumps(self.strings).encode('utf-8')
+        header = RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, self.window_size[0], self.window_size[1],
+                                       len(self.ops), len(args) * args.itemsize, len(strings))
+        with open(filename, 'wb') as file:
+            file.write(zlib.compress(header + self.ops.tobytes() + args.tobytes() + strings))
+
+    # read a recording written by save()
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as file:
+            data = zlib.decompress(file.read())
+        magic, version, width, height, ops_size, args_size, strings_size = RECORDING_HEADER.unpack_from(data)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            raise ValueError('file is not a turtle recording: ' + str(filename))
+        recorder = cls((width, height))
+        start = RECORDING_HEADER.size
+        recorder.ops.frombytes(data[start:start + ops_size])
+        start += ops_size
+        recorder.args.frombytes(data[start:start + args_size])
+        if sys.byteorder == 'big':
+            recorder.args.byteswap()
+        start += args_size
+        recorder.strings = json.loads(data[start:start + strings_size].decode('utf-8'))
+        recorder.string_indexes = {text: i for i, text in enumerate(recorder.strings)}
+        return recorder
+
+    # draw the recorded commands again, on 'canvas' or on a new canvas of the recorded size times 'scale'.
+    # 'speed' overrides the recorded turtle speeds; with instant=True nothing is animated and
+    # the drawing is rendered once at the end.
+    def replay(self, canvas=None, speed=None, instant=False, scale=1):
+        if canvas is None:
+            canvas = Canvas(round(self.window_size[0] * scale), round(self.window_size[1] * scale))
+        tracer_n = canvas.tracer()
+        if instant:
+            canvas.tracer(0)
+
+        ops, args, strings = self.ops, self.args, self.strings
+        turtles = []
+        turtle = None
+        i = 0
+        for op in ops:
+            if op == OP_POLYLINE:
+                count = int(args[i])
+                digits = canvas._positionDigits()
+                coords = array('d', (round(c * scale, digits) for c in args[i + 1:i + 1 + 2 * count]))
+                turtle._moveThrough(coords, turtle.turtle_degree)
+                i += 1 + 2 * count
+                continue
+            arg = args[i] if OP_ARG_COUNTS[op] else None
+            if op == OP_SELECT:
+                while len(turtles) <= arg:
+                    turtles.append(Turtle(canvas))
+                turtle = turtles[int(arg)]
+            elif op == OP_MOVE:
+                turtle._moveToNewPosition((arg * scale, args[i + 1] * scale))
+            elif op == OP_ARC:
+                turtle.arc(arg * scale, args[i + 1])
+            elif op == OP_HEADING:
+                turtle.face(arg)
+            elif op == OP_PEN:
+                if arg:
+                    turtle.pendown()
+                else:
+                    turtle.penup()
+            elif op == OP_SPEED:
+                turtle.speed(int(arg) if speed is None else speed)
+            elif op == OP_COLOR:
+                turtle.color(strings[int(arg)])
+            elif op == OP_WIDTH:
+                turtle.width(int(arg))
+            elif op == OP_SHAPE:
+                turtle.shape(strings[int(arg)])
+            elif op == OP_VISIBLE:
+                if arg:
+                    turtle.showturtle()
+                else:
+                    turtle.hideturtle()
+            elif op == OP_WRITE:
+                text, kwargs = json.loads(strings[int(arg)])
+                if 'font' in kwargs:
+                    kwargs['font'] = tuple(kwargs['font'])
+                turtle.write(text, **kwargs)
+            elif op == OP_BGCOLOR:
+                canvas.bgcolor(strings[int(arg)])
+            elif op == OP_CLEAR:
+                canvas.clear()
+            i += OP_ARG_COUNTS[op]
+
+        if instant:
+            canvas.tracer(tracer_n)
+            if not tracer_n:
+                canvas.update()
+        return canvas
+
+
+# counters of the work done for a canvas, see Canvas.stats()
+class _Counters:
+    __slots__ = ('moves', 'frames', 'bytes_sent', 'svg_calls', 'sleep_time', 'render_time', 'svg_time', 'start_time')
+
+    def __init__(self):
+        self.moves = 0
+        self.frames = 0  # frames shown by the backend
+        self.bytes_sent = 0  # size of those frames
+        self.svg_calls = 0
+        self.sleep_time = 0.0  # seconds spent in the animation delay
+        self.render_time = 0.0  # seconds spent making and sending frames
+        self.svg_time = 0.0  # seconds spent generating svg documents
+        self.start_time = time.perf_counter()
+
+
+# drawing area shared by one or more turtles, shown through a backend.
+# 'backend' is one of the names in BACKENDS or a backend instance, such as DeltaBackend(fps=60)
+class Canvas:
+    __slots__ = ('window_size', 'view', 'background_color', 'buffer', 'turtles', 'backend', 'tracer_n',
+                 'tracer_count', 'recorder', 'animator', 'counters', 'hooks', 'active_turtle')
+
+    def __init__(self, width=DEFAULT_WINDOW_SIZE[0], height=DEFAULT_WINDOW_SIZE[1], backend=DEFAULT_BACKEND):
+        self.window_size = width, height
+        if not (isinstance(self.window_size, tuple) and
+                isinstance(self.window_size[0], int) and
+                isinstance(self.window_size[1], int)):
+            raise ValueError('window_size must be a tuple of 2 integers')
+        self.view = (0, 0, width, height)  # x, y, width and height of the part of the drawing that is shown
+
+        if isinstance(backend, str):
+            if backend not in BACKENDS:
+                raise ValueError('backend is invalid. valid options are: ' + str(tuple(BACKENDS)))
+            backend = BACKENDS[backend]()
+
+        self.background_color = DEFAULT_BACKGROUND_COLOR
+        self.buffer = _DrawingBuffer()
+        self.turtles = []
+        self.active_turtle = None  # turtle that moved last, whose speed animates the canvas commands
+        self.tracer_n = DEFAULT_TRACER
+        self.tracer_count = 0
+        self.recorder = None
+        self.animator = None  # Animator playing the frames in 'async' animation mode
+        self.counters = _Counters()
+        self.hooks = {event: [] for event in HOOK_EVENTS}
+        self.backend = backend
+        self.backend.show(self)
+
+    # helper function for generating the whole svg string, leaving out the primitives outside the view.
+    # with a 'frame', made by _Frame(), the drawing is shown as it was then instead of as it is now.
+    def _generateSvgDrawing(self, svg_id='turtle', frame=None):
+        start = time.perf_counter()
+        path_id = svg_id + '-path'
+        if frame is None:
+            view, background_color = self.view, self.background_color
+            lines = self.buffer.svg(self._viewArea(), path_id)
+            turtle = ''.join(t._generateSvgDrawing() for t in self.turtles)
+        else:
+            view, background_color = frame.view, frame.background_color
+            if frame.items is self.buffer.items:
+                lines = self.buffer.itemsSvg(frame.viewArea(), frame.item_count)
+            else:  # the drawing was cleared since
+                lines = ''.join(frame.items[:frame.item_count])
+            lines += frame.pathSvg(path_id)
+            turtle = frame.turtlesSvg()
+        x, y, width, height = view
+        svg = SVG_TEMPLATE.format(svg_id=svg_id, window_width=self.window_size[0], window_height=self.window_size[1],
+                                  view_box=self._viewBoxString(view), view_x=x, view_y=y,
+                                  background_color=background_color, lines=lines, turtle=turtle)
+        seconds = time.perf_counter() - start
+        self.counters.svg_calls += 1
+        self.counters.svg_time += seconds
+        if self.hooks['svg']:
+            self._callHooks('svg', self, svg, seconds)
+        return svg
+
+    # helper function for the view as a box of x0, y0, x1, y1
+    def _viewArea(self):
+        x, y, width, height = self.view
+        return x, y, x + width, y + height
+
+    # helper function for the viewBox attribute of the view, or of 'view' if it is given
+    def _viewBoxString(self, view=None):
+        return ' '.join(str(round(v, 3)) for v in (self.view if view is None else view))
+
+    # helper function for updating the screen using the latest positions/angles/lines etc.
+    # only every 'tracer_n'-th call renders a frame; tracer_n == 0 disables rendering until update().
+    # without a 'speed', the frame is delayed by the speed of the turtle that moved last.
+    def _updateDrawing(self, speed=None):
+        if self.tracer_n == 0 or not self.backend.animated:
+            return
+        if speed is None:
+            speed = DEFAULT_SPEED if self.active_turtle is None else self.active_turtle.turtle_speed
+        self.tracer_count += 1
+        if self.tracer_count < self.tracer_n:
+            return
+        self.tracer_count = 0
+        counters = self.counters
+        start = time.perf_counter()
+        if self.animator is not None:
+            self.animator.add(_speedToSec(speed))
+        else:
+            time.sleep(_speedToSec(speed))
+            slept = time.perf_counter()
+            counters.sleep_time += slept - start
+            self.backend.update()
+            start = slept
+        seconds = time.perf_counter() - start
+        counters.render_time += seconds
+        if self.hooks['update']:
+            self._callHooks('update', self, seconds)
+
+    # render the current drawing right away, without the animation delay.
+    # in 'async' animation mode, it is shown right after the frames already queued.
+    def update(self):
+        self.tracer_count = 0
+        start = time.perf_counter()
+        if self.animator is not None:
+            self.animator.add(0)
+        else:
+            self.backend.flush()
+        self.counters.render_time += time.perf_counter() - start
+
+    # helper function called by the backends for every frame they show, with its size in characters
+    def _countFrame(self, size):
+        self.counters.frames += 1
+        self.counters.bytes_sent += size
+
+    # helper function that calls the hooks registered for 'event' with 'args'
+    def _callHooks(self, event, *args):
+        for hook in self.hooks[event]:
+            hook(*args)
+
+    # call 'function' on every 'event', one of HOOK_EVENTS:
+    #   'move': function(turtle, start, end) after a turtle moves, with its old and new position
+    #   'update': function(canvas, seconds) after a frame is rendered, with the seconds spent on it
+    #   'svg': function(canvas, svg, seconds) after an svg document is generated
+    def add_hook(self, event, function):
+        if event not in HOOK_EVENTS:
+            raise ValueError('event is invalid. valid options are: ' + str(HOOK_EVENTS))
+        if not callable(function):
+            raise ValueError('function must be callable.')
+        self.hooks[event].append(function)
+
+    # stop calling 'function' on 'event'
+    def remove_hook(self, event, function):
+        if event not in HOOK_EVENTS:
+            raise ValueError('event is invalid. valid options are: ' + str(HOOK_EVENTS))
+        if function not in self.hooks[event]:
+            raise ValueError('function is not a hook of ' + event + '.')
+        self.hooks[event].remove(function)
+
+    # return a dict with the work done since the canvas was made or since reset_stats():
+    # moves, frames shown and bytes sent to the display, primitives in the drawing, svg documents
+    # generated, and seconds spent in the animation delay (sleep_time), making and sending frames
+    # (render_time, which includes the svg_time of the frames), generating svg documents (svg_time)
+    # and everywhere else, mostly the user's code (user_time).
+    def stats(self):
+        counters = self.counters
+        total_time = time.perf_counter() - counters.start_time
+        return {
+            'moves': counters.moves,
+            'frames': counters.frames,
+            'bytes_sent': counters.bytes_sent,
+            'primitives': len(self.buffer.items) + (self.buffer.path_style is not None),
+            'svg_calls': counters.svg_calls,
+            'total_time': total_time,
+            'sleep_time': counters.sleep_time,
+            'render_time': counters.render_time,
+            'svg_time': counters.svg_time,
+            'user_time': max(total_time - counters.sleep_time - counters.render_time, 0.0),
+        }
+
+    # set all the counters of stats() to zero
+    def reset_stats(self):
+        self.counters = _Counters()
+
+    # set how moves are animated: 'sync' waits for each frame of the animation before returning,
+    # 'async' draws right away and plays the frames in the background, on the running asyncio
+    # event loop of the notebook kernel. Switching back to 'sync' shows the final drawing at once.
+    # if argument is omitted, it returns the current mode.
+    def animation(self, mode=None):
+        if mode is None:
+            return DEFAULT_ANIMATION if self.animator is None else 'async'
+
+        if mode not in VALID_ANIMATIONS:
+            raise ValueError('animation mode is invalid. valid options are: ' + str(VALID_ANIMATIONS))
+        if mode == 'async' and self.animator is None:
+            try:
+                self.animator = Animator(self.backend)
+            except RuntimeError:
+                raise RuntimeError("'async' animation needs a running asyncio event loop, such as a notebook kernel's.") from None
+        elif mode == 'sync' and self.animator is not None:
+            self.animator.skip()
+            self.animator = None
+
+    # in 'async' animation mode, drop the frames still waiting to be played and show the final drawing
+    def skip(self):
+        if self.animator is not None:
+            self.animator.skip()
+
+    # refresh the screen only every 'n'-th move; tracer(0) turns refreshing off until update() is called
+    # if argument is omitted, it returns the current setting.
+    def tracer(self, n=None):
+        if n is None:
+            return self.tracer_n
+
+        if isinstance(n, int) == False or n < 0:
+            raise ValueError('n must be a non-negative integer.')
+        self.tracer_n = n
+        self.tracer_count = 0
+        if self.tracer_n:
+            self.update()
+
+    # write the current drawing to an svg file, or to a png file if 'filename' ends with '.png'
+    def save(self, filename):
+        svg = self._generateSvgDrawing(self.backend.svg_id)
+        if filename.lower().endswith('.png'):
+            _writePng(filename, svg)
+        else:
+            _writeSvg(filename, svg)
+
+    # start recording the commands given to the turtles of this canvas into 'recorder',
+    # or into a new Recorder, which is returned. drawings made before the call are not recorded.
+    def record(self, recorder=None):
+        if recorder is None:
+            recorder = Recorder(self.window_size)
+        self.recorder = recorder
+        for t in self.turtles:
+            recorder.add(t, OP_SPEED, (t.turtle_speed,))
+        recorder.add(None, OP_BGCOLOR, (self.background_color,))
+        return recorder
+
+    # stop recording and return the recorder, if any
+    def stop_recording(self):
+        recorder = self.recorder
+        self.recorder = None
+        return recorder
+
+    # stop updating the display of this canvas
+    def close(self):
+        if self.animator is not None:
+            self.animator.stop()
+        self.backend.close()
+
+    # change the background color of the drawing area
+    # if no params, return the current background color
+    def bgcolor(self, color = None, c2 = None, c3 = None):
+        if color is None:
+            return self.background_color
+        elif c2 is not None:
+            if c3 is None:
+                raise ValueError('if the second argument is set, the third arguments must be set as well to complete the rgb set.')
+            color = (color, c2, c3)
+
+        self.background_color = _processColor(color)
+        if self.recorder is not None:
+            self.recorder.add(None, OP_BGCOLOR, (self.background_color,))
+        self._updateDrawing()
+
+    # clear any text or drawing on the screen
+    def clear(self):
+        self.buffer.clear()
+        if self.recorder is not None:
+            self.recorder.add(None, OP_CLEAR)
+        self._updateDrawing()
+
+    # helper function for the decimal digits that turtle positions are rounded to, to eliminate
+    # floating point errors: 3, or the precision of the paths if it is finer
+    def _positionDigits(self):
+        return max(DEFAULT_PRECISION, self.buffer.precision)
+
+    # change the number of decimal digits of the path coordinates drawn from now on;
+    # turtle positions are kept with at least 3 digits, even when fewer are written.
+    # if argument is omitted, it returns the current precision.
+    def precision(self, digits=None):
+        if digits is None:
+            return self.buffer.precision
+
+        if isinstance(digits, int) == False or digits < 0:
+            raise ValueError('digits must be a non-negative integer.')
+        self.buffer.configure(precision=digits)
+
+    # simplify the paths drawn from now on, leaving out points so that the drawing
+    # moves at most 'tolerance' units; simplify(0) turns simplification off.
+    # if argument is omitted, it returns the current tolerance.
+    def simplify(self, tolerance=None):
+        if tolerance is None:
+            return self.buffer.tolerance
+
+        if not isinstance(tolerance, (int,float)) or tolerance < 0:
+            raise ValueError('tolerance must be a non-negative number.')
+        self.buffer.configure(tolerance=tolerance)
+
+    # show the part of the drawing with the top left corner at 'x', 'y' and the given width and height,
+    # scaled to fill the window. arguments that are omitted keep their current value;
+    # if all of them are omitted, it returns the current view.
+    def viewbox(self, x=None, y=None, width=None, height=None):
+        if x is None and y is None and width is None and height is None:
+            return self.view
+
+        view = tuple(old if v is None else v for old, v in zip(self.view, (x, y, width, height)))
+        for v in view:
+            if not isinstance(v, (int,float)):
+                raise ValueError('x, y, width and height must be numbers.')
+        if view[2] <= 0 or view[3] <= 0:
+            raise ValueError('width and height must be positive.')
+        self.view = view
+        self.update()
+
+    # magnify the drawing by 'factor' around 'center', a point that stays in place,
+    # or around the middle of the view if it is omitted. a factor below 1 zooms out.
+    def zoom(self, factor, center=None):
+        if not isinstance(factor, (int,float)) or factor <= 0:
+            raise ValueError('factor must be a positive number.')
+        x, y, width, height = self.view
+        if center is None:
+            center = (x + width / 2, y + height / 2)
+        cx, cy = center
+        self.viewbox(cx - (cx - x) / factor, cy - (cy - y) / factor, width / factor, height / factor)
+
+    # move the view by 'dx', 'dy' drawing units
+    def pan(self, dx, dy):
+        if not isinstance(dx, (int,float)) or not isinstance(dy, (int,float)):
+            raise ValueError('dx and dy must be numbers.')
+        self.viewbox(self.view[0] + dx, self.view[1] + dy)
+
+    # return turtle window width
+    def window_width(self):
+        return self.window_size[0]
+
+    # return turtle window height
+    def window_height(self):
+        return self.window_size[1]
+
+
+# a turtle drawing on 'canvas'; several turtles may share the same canvas.
+# if no canvas is given, a new one with the default size and backend is created.
+class Turtle:
+    __slots__ = ('canvas', 'turtle_speed', 'is_turtle_visible', 'pen_color', 'turtle_color', 'turtle_pos',
+                 'turtle_degree', 'is_pen_down', 'pen_width', 'turtle_shape')
+
+    def __init__(self, canvas=None, speed=DEFAULT_SPEED):
+        if isinstance(speed,int) == False or speed not in range(1, 14):
+            raise ValueError('speed must be an integer in interval [1,13]')
+        if canvas is None:
+            canvas = Canvas()
+
+        self.canvas = canvas
+        self.turtle_speed = speed
+        self.is_turtle_visible = DEFAULT_TURTLE_VISIBILITY
+        self.pen_color = DEFAULT_PEN_COLOR
+        self.turtle_color = DEFAULT_TURTLE_COLOR
+        self.turtle_pos = (canvas.window_size[0] // 2, canvas.window_size[1] // 2)
+        self.turtle_degree = DEFAULT_TURTLE_DEGREE
+        self.is_pen_down = DEFAULT_IS_PEN_DOWN
+        self.pen_width = DEFAULT_PEN_WIDTH
+        self.turtle_shape = DEFAULT_TURTLE_SHAPE
+        canvas.turtles.append(self)
+        canvas.active_turtle = self
+        self._record(OP_SPEED, speed)
+        if canvas.tracer_n:
+            canvas.update()
+
+    # helper function for generating the svg transform that places the turtle shape
+    def _generateTransform(self):
+        turtle_x = self.turtle_pos[0]
+        turtle_y = self.turtle_pos[1]
+        degrees = self.turtle_degree
+
+        if self.turtle_shape == 'turtle':
+            turtle_x -= 18
+            turtle_y -= 18
+            degrees += 90
+        else: #circle
+            degrees -= 90
+
+        return 'rotate({degrees},{rotation_x},{rotation_y}) translate({turtle_x}, {turtle_y})'.format(
+            degrees=degrees, rotation_x=self.turtle_pos[0], rotation_y=self.turtle_pos[1], turtle_x=turtle_x, turtle_y=turtle_y)
+
+    # helper function for generating svg string of the turtle
+    def _generateSvgDrawing(self):
+        return _turtleSvg(self._look(), self._generateTransform())
+
+    # everything about how the turtle is drawn, except its position and heading
+    def _look(self):
+        return (self.turtle_shape, self.turtle_color, self.is_turtle_visible)
+
+    def _updateDrawing(self):
+        self.canvas.active_turtle = self
+        self.canvas._updateDrawing(self.turtle_speed)
+
+    # helper function that stores a command in the recorder of the canvas, if it is recording
+    def _record(self, op, *args):
+        if self.canvas.recorder is not None:
+            self.canvas.recorder.add(self, op, args)
+
+    # helper function for managing any kind of move to a given 'new_pos' and draw lines if pen is down
+    def _moveToNewPosition(self, new_pos):
+        # rounding the new_pos to eliminate floating point errors.
+        digits = self.canvas._positionDigits()
+        new_pos = ( round(new_pos[0],digits), round(new_pos[1],digits) )
+        self._record(OP_MOVE, *new_pos)
+
+        start_pos = self.turtle_pos
+        if self.is_pen_down:
+            self.canvas.buffer.line(start_pos, new_pos, self.pen_color, self.pen_width)
+
+        self.turtle_pos = new_pos
+        self._moved(start_pos)
+        self._updateDrawing()
+
+    # helper function that counts a move from 'start_pos' to the current position and calls the move hooks
+    def _moved(self, start_pos):
+        canvas = self.canvas
+        canvas.counters.moves += 1
+        if canvas.hooks['move']:
+            canvas._callHooks('move', self, start_pos, self.turtle_pos)
+
+    # makes the turtle move forward by 'units' units
+    def forward(self, units):
+        if not isinstance(units, (int,float)):
+            raise ValueError('units must be a number.')
+
+        alpha = math.radians(self.turtle_degree)
+        ending_point = (self.turtle_pos[0] + units * math.cos(alpha), self.turtle_pos[1] + units * math.sin(alpha))
+
+        self._moveToNewPosition(ending_point)
+
+    fd = forward # alias
+
+    # makes many moves in one call: for each step, the turtle turns left by 'turns[i]' degrees
+    # (or faces 'headings[i]') and then moves forward by 'lengths[i]' units. any of the arguments
+    # may be a single number used for every step. all points are computed at once, with numpy
+    # when it is installed, and the whole walk is added to the drawing as one primitive and one frame.
+    def walk(self, lengths, turns=None, headings=None):
+        if turns is not None and headings is not None:
+            raise ValueError('turns and headings cannot be used together.')
+        self._moveThrough(*self._walkPoints(lengths, turns, headings))
+
+    # helper function that returns the points of a walk from the current position and its final heading
+    def _walkPoints(self, lengths, turns=None, headings=None):
+        try:
+            import numpy
+        except ImportError:
+            return _walkPointsPython(self.turtle_pos, self.turtle_degree, lengths, turns, headings,
+                                     self.canvas._positionDigits())
+        return _walkPointsNumpy(numpy, self.turtle_pos, self.turtle_degree, lengths, turns, headings,
+                                self.canvas._positionDigits())
+
+    # helper function for moving through the points in 'coords' and then facing 'degree', as one frame
+    def _moveThrough(self, coords, degree):
+        if coords:
+            if self.canvas.recorder is not None:
+                self.canvas.recorder.addPolyline(self, coords)
+            if self.is_pen_down:
+                self.canvas.buffer.polyline(self.turtle_pos, coords, self.pen_color, self.pen_width)
+            start_pos = self.turtle_pos
+            self.turtle_pos = (coords[-2], coords[-1])
+            self._moved(start_pos)
+        self.turtle_degree = degree
+        self._record(OP_HEADING, degree)
+        self._updateDrawing()
+
+    # draws a circle whose center is 'radius' units to the left of the turtle (to the right if
+    # radius is negative), or only an arc of 'extent' degrees of it; a negative extent goes backwards.
+    # the curve is a single svg arc, unless 'steps' is given: then it is approximated by a regular
+    # polygon with that many sides, as in the standard turtle module.
+    def circle(self, radius, extent=None, steps=None):
+        if not isinstance(radius, (int,float)):
+            raise ValueError('radius must be a number.')
+        if extent is None:
+            extent = 360
+        elif not isinstance(extent, (int,float)):
+            raise ValueError('extent must be a number.')
+
+        if steps is None:
+            self.arc(radius, extent)
+            return
+        if isinstance(steps, int) == False or steps < 1:
+            raise ValueError('steps must be a positive integer.')
+
+        turn = extent / steps
+        length = 2 * radius * math.sin(math.radians(turn / 2))
+        if radius < 0:
+            length, turn, extent = -length, -turn, -extent
+        coords, _ = self._walkPoints(length, [turn / 2] + [turn] * (steps - 1))
+        self._moveThrough(coords, (self.turtle_degree - extent) % 360)
+
+    # draws an arc of 'extent' degrees of the circle whose center is 'radius' units to the left of
+    # the turtle (to the right if radius is negative), as a single svg arc
+    def arc(self, radius, extent):
+        if not isinstance(radius, (int,float)):
+            raise ValueError('radius must be a number.')
+        if not isinstance(extent, (int,float)):
+            raise ValueError('extent must be a number.')
+        self._record(OP_ARC, radius, extent)
+
+        # degrees turned to the left; svg arcs are split in pieces of at most half a circle
+        start_pos = self.turtle_pos
+        turn = extent if radius >= 0 else -extent
+        pieces = max(math.ceil(abs(turn) / 180), 1)
+        digits = self.canvas._positionDigits()
+        for i in range(pieces):
+            alpha = math.radians(self.turtle_degree)
+            center = (self.turtle_pos[0] + radius * math.sin(alpha), self.turtle_pos[1] - radius * math.cos(alpha))
+            degree = (self.turtle_degree - turn / pieces) % 360
+            alpha = math.radians(degree)
+            # rounding the end point to eliminate floating point errors.
+            end = (round(center[0] - radius * math.sin(alpha), digits), round(center[1] + radius * math.cos(alpha), digits))
+            if self.is_pen_down:
+                sweep = 1 if turn < 0 else 0
+                self.canvas.buffer.arc(self.turtle_pos, end, radius, sweep, self.pen_color, self.pen_width)
+            self.turtle_pos = end
+            self.turtle_degree = degree
+        self._moved(start_pos)
+        self._updateDrawing()
+
+    # makes the turtle move backward by 'units' units
+    def backward(self, units):
+        if not isinstance(units, (int,float)):
+            raise ValueError('units must be a number.')
+        self.forward(-1 * units)
+
+    bk = backward # alias
+    back = backward # alias
+
+    # makes the turtle move right by 'degrees' degrees (NOT radians)
+    def right(self, degrees):
+        if not isinstance(degrees, (int,float)):
+            raise ValueError('degrees must be a number.')
+
+        self.turtle_degree = (self.turtle_degree + degrees) % 360
+        self._record(OP_HEADING, self.turtle_degree)
+        self._updateDrawing()
+
+    rt = right # alias
+
+    # makes the turtle face a given direction
+    def face(self, degrees):
+        if not isinstance(degrees, (int,float)):
+            raise ValueError('degrees must be a number.')
+
+        self.turtle_degree = degrees % 360
+        self._record(OP_HEADING, self.turtle_degree)
+        self._updateDrawing()
+
+    setheading = face # alias
+    seth = face # alias
+
+    # makes the turtle move left by 'degrees' degrees (NOT radians, this library does not support radians right now)
+    def left(self, degrees):
+        if not isinstance(degrees, (int,float)):
+            raise ValueError('degrees must be a number.')
+        self.right(-1 * degrees)
+
+    lt = left
+
+    # raises the pen such that following turtle moves will not cause any drawings
+    def penup(self):
+        self.is_pen_down = False
+        self._record(OP_PEN, False)
+        # TODO: decide if we should put the timout after lifting the pen
+        # self._updateDrawing()
+
+    pu = penup # alias
+    up = penup # alias
+
+    # lowers the pen such that following turtle moves will now cause drawings
+    def pendown(self):
+        self.is_pen_down = True
+        self._record(OP_PEN, True)
+        # TODO: decide if we should put the timout after releasing the pen
+        # self._updateDrawing()
+
+    pd = pendown # alias
+    down = pendown # alias
+
+    def isdown(self):
+        return self.is_pen_down
+
+    # update the speed of the moves, [1,13]
+    # if argument is omitted, it returns the speed.
+    def speed(self, speed = None):
+        if speed is None:
+            return self.turtle_speed
+
+        if isinstance(speed,int) == False or speed not in range(1, 14):
+            raise ValueError('speed must be an integer in the interval [1,13].')
+        self.turtle_speed = speed
+        self._record(OP_SPEED, speed)
+        # TODO: decide if we should put the timout after changing the speed
+        # self._updateDrawing()
+
+    # move the turtle to a designated 'x' x-coordinate, y-coordinate stays the same
+    def setx(self, x):
+        if not isinstance(x, (int,float)):
+            raise ValueError('new x position must be a number.')
+        if x < 0:
+            raise ValueError('new x position must be non-negative.')
+        self._moveToNewPosition((x, self.turtle_pos[1]))
+
+    # move the turtle to a designated 'y' y-coordinate, x-coordinate stays the same
+    def sety(self, y):
+        if not isinstance(y, (int,float)):
+            raise ValueError('new y position must be a number.')
+        if y < 0:
+            raise ValueError('new y position must be non-negative.')
+        self._moveToNewPosition((self.turtle_pos[0], y))
+
+    def home(self):
+        self.turtle_degree = DEFAULT_TURTLE_DEGREE
+        self._record(OP_HEADING, self.turtle_degree)
+        window_size = self.canvas.window_size
+        self._moveToNewPosition( (window_size[0] // 2, window_size[1] // 2) ) # this will handle updating the drawing.
+
+    # retrieve the turtle's currrent 'x' x-coordinate
+    def getx(self):
+        return(self.turtle_pos[0])
+
+    xcor = getx # alias
+
+    # retrieve the turtle's currrent 'y' y-coordinate
+    def gety(self):
+        return(self.turtle_pos[1])
+
+    ycor = gety # alias
+
+    # retrieve the turtle's current position as a (x,y) tuple vector
+    def position(self):
+        return self.turtle_pos
+
+    pos = position # alias
+
+    # retrieve the turtle's current angle
+    def getheading(self):
+        return self.turtle_degree
+
+    heading = getheading # alias
+
+    # move the turtle to a designated 'x'-'y' coordinate
+    def moveto(self, x, y=None):
+        if isinstance(x, tuple) and y is None:
+            if len(x) != 2:
+                raise ValueError('the tuple argument must be of length 2.')
+
+            y = x[1]
+            x = x[0]
+
+        if not isinstance(x, (int,float)):
+            raise ValueError('new x position must be a number.')
+        if x < 0:
+            raise ValueError('new x position must be non-negative')
+        if not isinstance(y, (int,float)):
+            raise ValueError('new y position must be a number.')
+        if y < 0:
+            raise ValueError('new y position must be non-negative.')
+        self._moveToNewPosition((x, y))
+
+    goto = moveto # alias
+    setpos = moveto # alias
+    setposition = moveto # alias
+
+    # jump to a given location without leaving a trail
+    def jumpto(self, x, y=None):
+        flag = self.is_pen_down
+        self.penup()
+        self.goto(x, y)
+        if flag:
+            self.pendown()
+
+    # switch turtle visibility to ON
+    def showturtle(self):
+        self.is_turtle_visible = True
+        self._record(OP_VISIBLE, True)
+        self._updateDrawing()
+
+    st = showturtle # alias
+
+    # switch turtle visibility to OFF
+    def hideturtle(self):
+        self.is_turtle_visible = False
+        self._record(OP_VISIBLE, False)
+        self._updateDrawing()
+
+    ht = hideturtle # alias
+
+    def isvisible(self):
+        return self.is_turtle_visible
+
+    # change the color of the pen
+    # if no params, return the current pen color
+    def color(self, color = None, c2 = None, c3 = None):
+        if color is None:
+            return self.pen_color
+        elif c2 is not None:
+            if c3 is None:
+                raise ValueError('if the second argument is set, the third arguments must be set as well to complete the rgb set.')
+            color = (color, c2, c3)
+
+        self.pen_color = _processColor(color)
+        self._record(OP_COLOR, self.pen_color)
+        self._updateDrawing()
+
+    pencolor = color
+
+    # change the width of the lines drawn by the turtle, in pixels
+    # if the function is called without arguments, it returns the current width
+    def width(self, width = None):
+        if width is None:
+            return self.pen_width
+        else:
+            if not isinstance(width, int):
+                raise ValueError('new width position must be an integer.')
+            if not width > 0:
+                raise ValueError('new width position must be positive.')
+
+            self.pen_width = width
+            self._record(OP_WIDTH, width)
+            # TODO: decide if we should put the timout after changing the pen_width
+            # self._updateDrawing()
+
+    # pensize is an alias for width
+    pensize = width
+
+    def write(self, obj, **kwargs):
+        text = str(obj)
+        font_size = 12
+        font_family = 'Arial'
+        font_type = 'normal'
+        align = 'start'
+
+        if 'align' in kwargs and kwargs['align'] in ('left', 'center', 'right'):
+            if kwargs['align'] == 'left':
+                align = 'start'
+            elif kwargs['align'] == 'center':
+                align = 'middle'
+            else:
+                align = 'end'
+
+        if "font" in kwargs:
+            font = kwargs["font"]
+            if len(font) != 3 or isinstance(font[0], int) == False or isinstance(font[1], str) == False or font[2] not in {'bold','italic','underline','normal'}:
+                raise ValueError('font parameter must be a triplet consisting of font size (int), font family (str) and font type. font type can be one of {bold, italic, underline, normal}')
+            font_size = font[0]
+            font_family = font[1]
+            font_type = font[2]
+
+        style_string = ""
+        style_string += "font-size:" + str(font_size) + "px;"
+        style_string += "font-family:'" + font_family + "';"
+
+        if font_type == 'bold':
+            style_string += "font-weight:bold;"
+        elif font_type == 'italic':
+            style_string += "font-style:italic;"
+        elif font_type == 'underline':
+            style_string += "text-decoration: underline;"
+
+
+        # rough bounding box of the text, used to leave it out when it is outside the view
+        x, y = self.turtle_pos
+        text_width = 0.6 * font_size * len(text)
+        left = x - text_width * {'start': 0, 'middle': 0.5, 'end': 1}[align]
+        box = (left, y - font_size, left + text_width, y + 0.3 * font_size)
+
+        self._record(OP_WRITE, json.dumps([text, kwargs]))
+        self.canvas.buffer.append("""<text x="{x}" y="{y}" fill="{fill_color}" text-anchor="{align}" style="{style}">{text}</text>""".format(x=x, y=y, text=text, fill_color=self.pen_color, align=align, style=style_string), box)
+
+        self._updateDrawing()
+
+    def shape(self, shape=None):
+        if shape is None:
+            return self.turtle_shape
+        elif shape not in VALID_TURTLE_SHAPES:
+            raise ValueError('shape is invalid. valid options are: ' + str(VALID_TURTLE_SHAPES))
+
+        self.turtle_shape = shape
+        self._record(OP_SHAPE, shape)
+        self._updateDrawing()
+
+
+# the procedural functions below draw with the turtle created by the latest make_turtle() call
+default_turtle = None
+
+
+# construct the display for turtle
+# 'backend' is one of the names in BACKENDS or a backend instance, such as DeltaBackend(fps=60)
+def make_turtle(speed=DEFAULT_SPEED, width=DEFAULT_WINDOW_SIZE[0], height=DEFAULT_WINDOW_SIZE[1], backend=DEFAULT_BACKEND):
+    global default_turtle
 
+    if isinstance(speed,int) == False or speed not in range(1, 14):
+        raise ValueError('speed must be an integer in interval [1,13]')
 
-# helper function for generating the whole svg string
-def _generateSvgDrawing():
-    return SVG_TEMPLATE.format(window_width=window_size[0], window_height=window_size[1],
-                               background_color=background_color, lines=svg_lines_string,
-                               turtle=_generateTurtleSvgDrawing())
+    canvas = Canvas(width, height, backend)
+    if default_turtle is not None:
+        default_turtle.canvas.close()
+    default_turtle = Turtle(canvas, speed)
+    return default_turtle
 
 
-# helper functions for updating the screen using the latest positions/angles/lines etc.
-def _updateDrawing():
-    if drawing_window == None:
+# helper function that returns the turtle used by the procedural functions
+def _defaultTurtle():
+    if default_turtle is None:
         raise AttributeError("Display has not been initialized yet. Call make_turtle() before using.")
-    time.sleep(_speedToSec(turtle_speed))
-    drawing_window.update(HTML(_generateSvgDrawing()))
+    return default_turtle
 
 
-# helper function for managing any kind of move to a given 'new_pos' and draw lines if pen is down
-def _moveToNewPosition(new_pos):
-    global turtle_pos
-    global svg_lines_string
+def update():
+    _defaultTurtle().canvas.update()
 
-    # rounding the new_pos to eliminate floating point errors.
-    new_pos = ( round(new_pos[0],3), round(new_pos[1],3) )
+def tracer(n=None):
+    return _defaultTurtle().canvas.tracer(n)
 
-    start_pos = turtle_pos
-    if is_pen_down:
-        svg_lines_string += """<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke-linecap="round" style="stroke:{pen_color};stroke-width:{pen_width}"/>""".format(
-            x1=start_pos[0], y1=start_pos[1], x2=new_pos[0], y2=new_pos[1], pen_color=pen_color, pen_width=pen_width)
+def save(filename):
+    _defaultTurtle().canvas.save(filename)
 
-    turtle_pos = new_pos
-    _updateDrawing()
+def precision(digits=None):
+    return _defaultTurtle().canvas.precision(digits)
 
+def simplify(tolerance=None):
+    return _defaultTurtle().canvas.simplify(tolerance)
 
-# makes the turtle move forward by 'units' units
-def forward(units):
-    if not isinstance(units, (int,float)):
-        raise ValueError('units must be a number.')
+def viewbox(x=None, y=None, width=None, height=None):
+    return _defaultTurtle().canvas.viewbox(x, y, width, height)
+
+def zoom(factor, center=None):
+    _defaultTurtle().canvas.zoom(factor, center)
+
+def pan(dx, dy):
+    _defaultTurtle().canvas.pan(dx, dy)
+
+def animation(mode=None):
+    return _defaultTurtle().canvas.animation(mode)
+
+def stats():
+    return _defaultTurtle().canvas.stats()
 
-    alpha = math.radians(turtle_degree)
-    ending_point = (turtle_pos[0] + units * math.cos(alpha), turtle_pos[1] + units * math.sin(alpha))
+def reset_stats():
+    _defaultTurtle().canvas.reset_stats()
 
-    _moveToNewPosition(ending_point)
+def add_hook(event, function):
+    _defaultTurtle().canvas.add_hook(event, function)
+
+def remove_hook(event, function):
+    _defaultTurtle().canvas.remove_hook(event, function)
+
+def skip():
+    _defaultTurtle().canvas.skip()
+
+def record(recorder=None):
+    return _defaultTurtle().canvas.record(recorder)
+
+def stop_recording():
+    return _defaultTurtle().canvas.stop_recording()
+
+def forward(units):
+    _defaultTurtle().forward(units)
 
 fd = forward # alias
 
-# makes the turtle move backward by 'units' units
+def walk(lengths, turns=None, headings=None):
+    _defaultTurtle().walk(lengths, turns, headings)
+
+def circle(radius, extent=None, steps=None):
+    _defaultTurtle().circle(radius, extent, steps)
+
+def arc(radius, extent):
+    _defaultTurtle().arc(radius, extent)
+
 def backward(units):
-    if not isinstance(units, (int,float)):
-        raise ValueError('units must be a number.')
-    forward(-1 * units)
+    _defaultTurtle().backward(units)
 
 bk = backward # alias
 back = backward # alias
 
-
-# makes the turtle move right by 'degrees' degrees (NOT radians)
 def right(degrees):
-    global turtle_degree
-
-    if not isinstance(degrees, (int,float)):
-        raise ValueError('degrees must be a number.')
-
-    turtle_degree = (turtle_degree + degrees) % 360
-    _updateDrawing()
+    _defaultTurtle().right(degrees)
 
 rt = right # alias
 
-# makes the turtle face a given direction
 def face(degrees):
-    global turtle_degree
-
-    if not isinstance(degrees, (int,float)):
-        raise ValueError('degrees must be a number.')
-
-    turtle_degree = degrees % 360
-    _updateDrawing()
+    _defaultTurtle().face(degrees)
 
 setheading = face # alias
 seth = face # alias
 
-# makes the turtle move right by 'degrees' degrees (NOT radians, this library does not support radians right now)
 def left(degrees):
-    if not isinstance(degrees, (int,float)):
-        raise ValueError('degrees must be a number.')
-    right(-1 * degrees)
+    _defaultTurtle().left(degrees)
 
 lt = left
 
-# raises the pen such that following turtle moves will not cause any drawings
 def penup():
-    global is_pen_down
-
-    is_pen_down = False
-    # TODO: decide if we should put the timout after lifting the pen
-    # _updateDrawing()
+    _defaultTurtle().penup()
 
 pu = penup # alias
 up = penup # alias
 
-# lowers the pen such that following turtle moves will now cause drawings
 def pendown():
-    global is_pen_down
-
-    is_pen_down = True
-    # TODO: decide if we should put the timout after releasing the pen
-    # _updateDrawing()
+    _defaultTurtle().pendown()
 
 pd = pendown # alias
 down = pendown # alias
 
 def isdown():
-    return is_pen_down
+    return _defaultTurtle().isdown()
 
-# update the speed of the moves, [1,13]
-# if argument is omitted, it returns the speed.
 def speed(speed = None):
-    global turtle_speed
-
-    if speed is None:
-        return turtle_speed
+    return _defaultTurtle().speed(speed)
 
-    if isinstance(speed,int) == False or speed not in range(1, 14):
-        raise ValueError('speed must be an integer in the interval [1,13].')
-    turtle_speed = speed
-    # TODO: decide if we should put the timout after changing the speed
-    # _updateDrawing()
-
-
-# move the turtle to a designated 'x' x-coordinate, y-coordinate stays the same
 def setx(x):
-    if not isinstance(x, (int,float)):
-        raise ValueError('new x position must be a number.')
-    if x < 0:
-        raise ValueError('new x position must be non-negative.')
-    _moveToNewPosition((x, turtle_pos[1]))
-
+    _defaultTurtle().setx(x)
 
-# move the turtle to a designated 'y' y-coordinate, x-coordinate stays the same
 def sety(y):
-    if not isinstance(y, (int,float)):
-        raise ValueError('new y position must be a number.')
-    if y < 0:
-        raise ValueError('new y position must be non-negative.')
-    _moveToNewPosition((turtle_pos[0], y))
-
+    _defaultTurtle().sety(y)
 
 def home():
-    global turtle_degree
-
-    turtle_degree = DEFAULT_TURTLE_DEGREE
-    _moveToNewPosition( (window_size[0] // 2, window_size[1] // 2) ) # this will handle updating the drawing.
+    _defaultTurtle().home()
 
-# retrieve the turtle's currrent 'x' x-coordinate
 def getx():
-    return(turtle_pos[0])
+    return _defaultTurtle().getx()
 
 xcor = getx # alias
 
-# retrieve the turtle's currrent 'y' y-coordinate
 def gety():
-    return(turtle_pos[1])
+    return _defaultTurtle().gety()
 
 ycor = gety # alias
 
-# retrieve the turtle's current position as a (x,y) tuple vector
 def position():
-    return turtle_pos
+    return _defaultTurtle().position()
 
 pos = position # alias
 
-# retrieve the turtle's current angle
 def getheading():
-    return turtle_degree
+    return _defaultTurtle().getheading()
 
 heading = getheading # alias
 
-# move the turtle to a designated 'x'-'y' coordinate
 def moveto(x, y=None):
-    if isinstance(x, tuple) and y is None:
-        if len(x) != 2:
-            raise ValueError('the tuple argument must be of length 2.')
-
-        y = x[1]
-        x = x[0]
-
-    if not isinstance(x, (int,float)):
-        raise ValueError('new x position must be a number.')
-    if x < 0:
-        raise ValueError('new x position must be non-negative')
-    if not isinstance(y, (int,float)):
-        raise ValueError('new y position must be a number.')
-    if y < 0:
-        raise ValueError('new y position must be non-negative.')
-    _moveToNewPosition((x, y))
+    _defaultTurtle().moveto(x, y)
 
 goto = moveto # alias
 setpos = moveto # alias
 setposition = moveto # alias
 
-# jump to a given location without leaving a trail
 def jumpto(x, y=None):
-    flag = is_pen_down
-    penup()
-    goto(x, y)
-    if flag:
-        pendown()
+    _defaultTurtle().jumpto(x, y)
 
-# switch turtle visibility to ON
 def showturtle():
-    global is_turtle_visible
-
-    is_turtle_visible = True
-    _updateDrawing()
+    _defaultTurtle().showturtle()
 
 st = showturtle # alias
 
-# switch turtle visibility to OFF
 def hideturtle():
-    global is_turtle_visible
-
-    is_turtle_visible = False
-    _updateDrawing()
+    _defaultTurtle().hideturtle()
 
 ht = hideturtle # alias
 
 def isvisible():
-    return is_turtle_visible
+    return _defaultTurtle().isvisible()
 
-def _validateColorString(color):
-    if color in VALID_COLORS_SET: # 140 predefined html color names
-        return True
-    if re.search(r"^#(?:[0-9a-fA-F]{3}){1,2}$", color): # 3 or 6 digit hex color code
-        return True
-    if re.search(r"rgb\(\s*(?:(?:\d{1,2}|1\d\d|2(?:[0-4]\d|5[0-5]))\s*,?){3}\)$", color): # rgb color code
-        return True
-    return False
-
-def _validateColorTuple(color):
-    if len(color) != 3:
-        return False
-    if not isinstance(color[0], int) or not isinstance(color[1], int) or not isinstance(color[2], int):
-        return False
-    if not 0 <= color[0] <= 255 or not 0 <= color[1] <= 255 or not 0 <= color[2] <= 255:
-        return False
-    return True
-
-def _processColor(color):
-    if isinstance(color, str):
-        color = color.lower()
-        if not _validateColorString(color):
-            raise ValueError('color is invalid. it can be a known html color name, 3-6 digit hex string or rgb string.')
-        return color
-    elif isinstance(color, tuple):
-        if not _validateColorTuple(color):
-            raise ValueError('color tuple is invalid. it must be a tuple of three integers, which are in the interval [0,255]')
-        return 'rgb(' + str(color[0]) + ',' + str(color[1]) + ',' + str(color[2]) + ')'
-    else:
-        raise ValueError('the first parameter must be a color string or a tuple')
-
-# change the background color of the drawing area
-# if no params, return the current background color
 def bgcolor(color = None, c2 = None, c3 = None):
-    global background_color
-
-    if color is None:
-        return background_color
-    elif c2 is not None:
-        if c3 is None:
-            raise ValueError('if the second argument is set, the third arguments must be set as well to complete the rgb set.')
-        color = (color, c2, c3)
+    return _defaultTurtle().canvas.bgcolor(color, c2, c3)
 
-    background_color = _processColor(color)
-    _updateDrawing()
-
-
-# change the color of the pen
-# if no params, return the current pen color
 def color(color = None, c2 = None, c3 = None):
-    global pen_color
-
-    if color is None:
-        return pen_color
-    elif c2 is not None:
-        if c3 is None:
-            raise ValueError('if the second argument is set, the third arguments must be set as well to complete the rgb set.')
-        color = (color, c2, c3)
-
-    pen_color = _processColor(color)
-    _updateDrawing()
+    return _defaultTurtle().color(color, c2, c3)
 
 pencolor = color
 
-# change the width of the lines drawn by the turtle, in pixels
-# if the function is called without arguments, it returns the current width
 def width(width = None):
-    global pen_width
-
-    if width is None:
-        return pen_width
-    else:
-        if not isinstance(width, int):
-            raise ValueError('new width position must be an integer.')
-        if not width > 0:
-            raise ValueError('new width position must be positive.')
-
-        pen_width = width
-        # TODO: decide if we should put the timout after changing the pen_width
-        # _updateDrawing()
+    return _defaultTurtle().width(width)
 
 # pensize is an alias for width
 pensize = width
 
-# clear any text or drawing on the screen
 def clear():
-    global svg_lines_string
-
-    svg_lines_string = ""
-    _updateDrawing()
+    _defaultTurtle().canvas.clear()
 
 def write(obj, **kwargs):
-    global svg_lines_string
-    global turtle_pos
-    text = str(obj)
-    font_size = 12
-    font_family = 'Arial'
-    font_type = 'normal'
-    align = 'start'
-
-    if 'align' in kwargs and kwargs['align'] in ('left', 'center', 'right'):
-        if kwargs['align'] == 'left':
-            align = 'start'
-        elif kwargs['align'] == 'center':
-            align = 'middle'
-        else:
-            align = 'end'
-
-    if "font" in kwargs:
-        font = kwargs["font"]
-        if len(font) != 3 or isinstance(font[0], int) == False or isinstance(font[1], str) == False or font[2] not in {'bold','italic','underline','normal'}:
-            raise ValueError('font parameter must be a triplet consisting of font size (int), font family (str) and font type. font type can be one of {bold, italic, underline, normal}')
-        font_size = font[0]
-        font_family = font[1]
-        font_type = font[2]
-
-    style_string = ""
-    style_string += "font-size:" + str(font_size) + "px;"
-    style_string += "font-family:'" + font_family + "';"
-
-    if font_type == 'bold':
-        style_string += "font-weight:bold;"
-    elif font_type == 'italic':
-        style_string += "font-style:italic;"
-    elif font_type == 'underline':
-        style_string += "text-decoration: underline;"
-
-
-    svg_lines_string += """<text x="{x}" y="{y}" fill="{fill_color}" text-anchor="{align}" style="{style}">{text}</text>""".format(x=turtle_pos[0], y=turtle_pos[1], text=text, fill_color=pen_color, align=align, style=style_string)
-
-    _updateDrawing()
+    _defaultTurtle().write(obj, **kwargs)
 
 def shape(shape=None):
-    global turtle_shape
-    if shape is None:
-        return turtle_shape
-    elif shape not in VALID_TURTLE_SHAPES:
-        raise ValueError('shape is invalid. valid options are: ' + str(VALID_TURTLE_SHAPES))
-
-    turtle_shape = shape
-    _updateDrawing()
+    return _defaultTurtle().shape(shape)
 
-# return turtle window width
 def window_width():
-    return window_size[0]
+    return _defaultTurtle().canvas.window_width()
 
-# return turtle window height
 def window_height():
-    return window_size[1]
+    return _defaultTurtle().canvas.window_height()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Turtle.py Benchmarks
+Times the drawing hot paths headlessly, with a stub display that renders every frame
+but shows nothing, and compares the results with a saved baseline.
+
+    python bench_turtle.py --save baseline.json
+    python bench_turtle.py --compare baseline.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import time
+import timeit
+import tracemalloc
+
+import Turtle
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_THRESHOLD = 10  # percent
+DEFAULT_REPEAT = 5  # runs of each case; the fastest one is reported
+MIN_RUN_TIME = 0.2  # seconds; short cases run more times until they add up to this, like timeit.autorange
+CONFIRM_RUNS = 3  # times a case slower than the baseline is measured again before it counts as a regression
+COMPARED = ('per_call_us', 'peak_bytes', 'svg_bytes')
+STEP = 3
+ANGLE = 7
+CANVAS_SIZE = 800
+
+BENCHMARKS = {}
+
+
+class StubBackend:
+    """Backend that renders the whole svg document on every frame, like the notebook
+    backend, but only counts the frames and bytes instead of displaying them."""
+
+    animated = True
+
+    def __init__(self):
+        self.svg_id = 'bench'
+        self.canvas = None
+        self.frames = 0
+        self.bytes_sent = 0
+
+    def show(self, canvas):
+        self.canvas = canvas
+        self.flush()
+
+    def update(self):
+        self.flush()
+
+    def flush(self):
+        self.frames += 1
+        self.bytes_sent += len(self.canvas._generateSvgDrawing(self.svg_id))
+
+    def close(self):
+        pass
+
+
+def benchmark(name, max_size=None, repeatable=False):
+    """Register a benchmark; sizes above max_size are skipped unless --all is given.
+
+    The action of a repeatable benchmark does the same work each time it is called,
+    so it is timed in a loop on one drawing instead of on a new drawing each run.
+    """
+    def register(function):
+        BENCHMARKS[name] = (function, max_size, repeatable)
+        return function
+    return register
+
+
+def new_drawing(tracer=0, speed=13):
+    """Return a canvas with a stub display and one turtle on it."""
+    canvas = Turtle.Canvas(CANVAS_SIZE, CANVAS_SIZE, backend=StubBackend())
+    canvas.tracer(tracer)
+    turtle = Turtle.Turtle(canvas, speed)
+    return canvas, turtle
+
+
+def draw(turtle, size):
+    for _ in range(size):
+        turtle.forward(STEP)
+        turtle.left(ANGLE)
+
+
+@benchmark('forward')
+def bench_forward(size):
+    """forward() and _moveToNewPosition() with rendering turned off."""
+    canvas, turtle = new_drawing(tracer=0)
+
+    def action():
+        draw(turtle, size)
+    return canvas, action
+
+
+@benchmark('forward+frames', max_size=10_000)
+def bench_forward_frames(size):
+    """forward() rendering the whole document on every move, without the animation sleep."""
+    canvas, turtle = new_drawing(tracer=1)
+
+    def action():
+        saved = Turtle.SPEED_TO_SEC_MAP[13]
+        Turtle.SPEED_TO_SEC_MAP[13] = 0
+        try:
+            draw(turtle, size)
+        finally:
+            Turtle.SPEED_TO_SEC_MAP[13] = saved
+    return canvas, action
+
+
+@benchmark('forward+frames+sleep', max_size=1_000)
+def bench_forward_sleep(size):
+    """forward() rendering on every move, including the animation sleep at speed 13."""
+    canvas, turtle = new_drawing(tracer=1)
+
+    def action():
+        draw(turtle, size)
+    return canvas, action
+
+
+@benchmark('walk')
+def bench_walk(size):
+    """walk() computing all the steps of the same drawing in one call."""
+    canvas, turtle = new_drawing(tracer=0)
+    try:
+        import numpy  # noqa: F401  keep the import time out of the measurement
+    except ImportError:
+        pass
+
+    def action():
+        turtle.walk(STEP, [0] + [ANGLE] * (size - 1))
+    return canvas, action
+
+
+@benchmark('write', max_size=10_000)
+def bench_write(size):
+    """write() of a short label at each step."""
+    canvas, turtle = new_drawing(tracer=0)
+
+    def action():
+        for i in range(size):
+            turtle.write(i)
+            turtle.forward(STEP)
+            turtle.left(ANGLE)
+    return canvas, action
+
+
+@benchmark('generate_svg', repeatable=True)
+def bench_generate_svg(size):
+    """_generateSvgDrawing() of a finished drawing, one call with an empty cache."""
+    canvas, turtle = new_drawing(tracer=0)
+    draw(turtle, size)
+    canvas.buffer.closePath()
+
+    def action():
+        canvas.buffer.items_svg = ''
+        canvas.buffer.cached_items = 0
+        canvas._generateSvgDrawing('bench')
+    return canvas, action
+
+
+@benchmark('generate_svg+view', repeatable=True)
+def bench_generate_svg_view(size):
+    """_generateSvgDrawing() of a drawing much larger than the window, zoomed into a small part of it."""
+    canvas, turtle = new_drawing(tracer=0)
+    row = int(size ** 0.5)
+    for y in range(size // row):
+        turtle.jumpto(0, y * STEP)
+        for _ in range(row):
+            turtle.forward(STEP)
+    canvas.viewbox(0, 0, CANVAS_SIZE / 8, CANVAS_SIZE / 8)
+
+    def action():
+        canvas._generateSvgDrawing('bench')
+    return canvas, action
+
+
+def measure(name, size, memory=True, repeat=DEFAULT_REPEAT):
+    """Run benchmark 'name' with 'size' segments and return a dict of results.
+
+    The time is the fastest of at least 'repeat' runs: of the action called in a loop
+    long enough for timeit.autorange when the benchmark is repeatable, else of a new
+    drawing each run, until the runs add up to MIN_RUN_TIME.
+    """
+    function, _, repeatable = BENCHMARKS[name]
+    if repeatable:
+        canvas, action = function(size)
+        timer = timeit.Timer(action)
+        number, _ = timer.autorange()
+        seconds = min(timer.repeat(repeat, number)) / number
+        calls = 1
+    else:
+        times = []
+        while len(times) < repeat or sum(times) < MIN_RUN_TIME:
+            canvas, action = function(size)
+            gc.collect()
+            gc.disable()  # like timeit, so that collections started by earlier cases do not count
+            try:
+                start = time.perf_counter()
+                action()
+                times.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+        seconds = min(times)
+        calls = size
+
+    result = {
+        'name': name,
+        'size': size,
+        'seconds': seconds,
+        'per_call_us': seconds / calls * 1e6,
+        'svg_bytes': len(canvas._generateSvgDrawing('bench')),
+        'frames': canvas.backend.frames,
+        'sent_bytes': canvas.backend.bytes_sent,
+        'peak_bytes': None,
+    }
+
+    if memory:  # second run, since tracemalloc slows down the timed one
+        canvas, action = function(size)
+        gc.collect()
+        tracemalloc.start()
+        action()
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def format_bytes(count):
+    if count is None:
+        return '-'
+    for unit in ('B', 'kB', 'MB'):
+        if count < 1000:
+            return f"{count:.0f}{unit}"
+        count /= 1000
+    return f"{count:.1f}GB"
+
+
+def print_results(results):
+    """Print the results in a formatted table."""
+    print(f"{'Benchmark':<22} {'Size':>7} {'Total s':>9} {'us/call':>9} {'Peak mem':>9} {'SVG':>9} {'Frames':>7} {'Sent':>9}")
+    print("-" * 89)
+    for r in results:
+        print(f"{r['name']:<22} {r['size']:>7} {r['seconds']:>9.3f} {r['per_call_us']:>9.2f} "
+              f"{format_bytes(r['peak_bytes']):>9} {format_bytes(r['svg_bytes']):>9} "
+              f"{r['frames']:>7} {format_bytes(r['sent_bytes']):>9}")
+
+
+def percent_change(new, old):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def regressed(result, old, threshold):
+    """Whether any of the COMPARED values of result grew more than threshold percent over old."""
+    return any(c is not None and c > threshold for c in (percent_change(result[key], old[key]) for key in COMPARED))
+
+
+def confirm(results, baseline, threshold, repeat=DEFAULT_REPEAT):
+    """Measure the time of the results slower than the baseline again, keeping the fastest.
+
+    The speed of a machine drifts over seconds, so a later measurement tells a slow
+    moment from a real regression.
+    """
+    old_results = {(r['name'], r['size']): r for r in baseline['results']}
+    for _ in range(CONFIRM_RUNS):
+        for r in results:
+            old = old_results.get((r['name'], r['size']))
+            if old is not None and regressed(r, old, threshold):
+                again = measure(r['name'], r['size'], memory=False, repeat=repeat)
+                if again['per_call_us'] < r['per_call_us']:
+                    r['seconds'], r['per_call_us'] = again['seconds'], again['per_call_us']
+
+
+def compare(results, baseline, threshold):
+    """Print the change of each result against the baseline and return the number of regressions."""
+    old_results = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = 0
+    print(f"\nComparison with baseline ({baseline.get('python', '?')}, threshold {threshold}%):")
+    print(f"{'Benchmark':<22} {'Size':>7} {'us/call':>10} {'Peak mem':>10} {'SVG':>10}")
+    print("-" * 63)
+    for r in results:
+        old = old_results.get((r['name'], r['size']))
+        if old is None:
+            continue
+        columns = ['-' if c is None else f"{c:+.1f}%" for c in (percent_change(r[key], old[key]) for key in COMPARED)]
+        slower = regressed(r, old, threshold)
+        regressions += slower
+        print(f"{r['name']:<22} {r['size']:>7} {columns[0]:>10} {columns[1]:>10} {columns[2]:>10}"
+              f"{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[1])
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help='benchmarks to run (default: all of ' + ', '.join(BENCHMARKS) + ')')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='number of segments of each drawing')
+    parser.add_argument('--all', action='store_true', help='run every size, even the slow ones')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory measurement')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='runs of each case, reporting the fastest')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='percent increase reported as a regression')
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    results = []
+    for name in args.benchmarks or BENCHMARKS:
+        _, max_size, _ = BENCHMARKS[name]
+        for size in args.sizes:
+            if max_size is not None and size > max_size and not args.all:
+                continue
+            results.append(measure(name, size, memory=not args.no_memory, repeat=args.repeat))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        confirm(results, baseline, args.threshold, args.repeat)
+
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results}, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if baseline is not None:
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,61 @@
 #!/usr/bin/env python3
 """
-Class C Network Scanner
-Discovers active devices on a Class C network and resolves their hostnames.
+Network Scanner
+Discovers active devices on local networks of any size and resolves their hostnames.
+
+    python lanscan.py
+    python lanscan.py 192.168.1.0/24 10.0.0.0/16 --rate 2000
 """
 
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
 import socket
+import struct
 import subprocess
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import ipaddress
 import platform
+from pathlib import Path
+
+PING_TIMEOUT = 1.0  # seconds to wait for echo replies after the last request
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_PAYLOAD = b"lanscan.py probe"  # echoed back by the hosts
+RECEIVE_BUFFER = 1 << 20  # bytes, to hold the replies of a whole window
+DEFAULT_WINDOW = 256  # most hosts probed at once, waiting for a reply
+DEFAULT_RATE = 1000  # echo requests per second
+
+DNS_PORT = 53
+DNS_TIMEOUT = 1.0  # seconds per attempt of a PTR query
+DNS_ATTEMPTS = 2  # each one to the next nameserver
+DNS_CONCURRENCY = 64  # most PTR queries waiting for an answer at once
+DNS_TYPE_PTR = 12
+DNS_TYPE_SOA = 6
+DNS_NXDOMAIN = 3
+MIN_CACHE_TTL = 60  # seconds; dnsmasq answers names of DHCP leases with a TTL of 0
+NEGATIVE_CACHE_TTL = 300  # seconds to remember an address without a name, if the answer has no SOA
+CACHE_FILE = Path.home() / ".cache" / "lanscan-ptr.json"
+MDNS_PORT = 5353  # asked directly, mDNS responders answer with the .local name of their address
+MDNS_TIMEOUT = 0.5  # seconds; most hosts do not run a responder
+HOSTS_FILE = (os.path.join(os.environ.get("SystemRoot", r"C:\Windows"), "System32", "drivers", "etc", "hosts")
+              if platform.system() == "Windows" else "/etc/hosts")
+
+NEIGHBOR_FILE = "/proc/net/arp"
+NEIGHBOR_REFRESH = 1.0  # seconds between reads of the neighbor table for hosts not in it yet
+ATF_COM = 0x2  # flag of the complete entries of /proc/net/arp
+# MAC address prefix databases, in the formats of IEEE, nmap and Wireshark
+OUI_FILES = ("/usr/share/ieee-data/oui.txt", "/usr/share/misc/oui.txt",
+             "/usr/share/nmap/nmap-mac-prefixes", "/usr/share/wireshark/manuf")
+OUI_LINE = re.compile(r"([0-9A-Fa-f]{2})[-:]?([0-9A-Fa-f]{2})[-:]?([0-9A-Fa-f]{2})"
+                      r"(?:\s+\((?:hex|base 16)\))?\s+(.+)")
+WINDOWS_ARP_LINE = re.compile(r"\s*(\d+\.\d+\.\d+\.\d+)\s+([0-9a-fA-F]{2}(?:-[0-9a-fA-F]{2}){5})\s")
+BSD_ARP_LINE = re.compile(r".*\((\d+\.\d+\.\d+\.\d+)\) at ([0-9a-fA-F]{1,2}(?::[0-9a-fA-F]{1,2}){5})")
 
 def get_local_network():
     """Get the local network subnet automatically."""
@@ -22,14 +67,50 @@ def get_local_network():
         s.close()
         
         # Convert to network address (assumes /24 subnet)
-        network = ipaddress.IPv4Network(f"{local_ip}/24", strict=False)
-        return str(network.network_address)[:-1]  # Remove last digit
+        return ipaddress.IPv4Network(f"{local_ip}/24", strict=False)
     except Exception as e:
         print(f"Error detecting local network: {e}")
-        default = "192.168.1."
+        default = ipaddress.IPv4Network("192.168.1.0/24")
         print("\tReturning default:", default)
         return default
 
+def parse_networks(text):
+    """
+    Parse networks separated by spaces or commas into a list of IPv4Network.
+    
+    Accepts CIDR networks (e.g. "10.0.0.0/16"), single addresses and, as before,
+    the base of a class C network (e.g. "192.168.1."). Raises ValueError.
+    """
+    networks = []
+    for item in text.replace(",", " ").split():
+        if item.endswith("."):
+            item += "0/24"
+        networks.append(ipaddress.IPv4Network(item, strict=False))
+    return networks
+
+def network_hosts(networks):
+    """Generate the host addresses of each network in turn, without building a list."""
+    for network in networks:
+        if network.num_addresses == 1:
+            yield str(network.network_address)
+        else:
+            for address in network.hosts():
+                yield str(address)
+
+class RateLimiter:
+    """Spaces out events to at most rate per second; None for no limit."""
+    
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_time = time.monotonic()
+    
+    def delay(self):
+        """Seconds until the next event is allowed."""
+        return max(self.next_time - time.monotonic(), 0)
+    
+    def take(self):
+        self.next_time = max(self.next_time, time.monotonic()) + self.interval
+
 def ping_host(ip):
     """Ping a single host to check if it's alive."""
     try:
@@ -45,30 +126,470 @@ def ping_host(ip):
     except (subprocess.TimeoutExpired, subprocess.SubprocessError):
         return False
 
-def resolve_hostname(ip):
-    """Resolve hostname for an IP address using multiple methods."""
-    hostname = "Unknown"
+def icmp_checksum(data):
+    """Internet checksum of an ICMP message."""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def open_icmp_socket():
+    """
+    Open a socket for sending ICMP echo requests.
     
-    # Method 1: Standard reverse DNS lookup
+    Returns (socket, raw): an unprivileged ICMP datagram socket on Linux if
+    net.ipv4.ping_group_range allows it, else a raw socket, which needs root.
+    Raises OSError if neither is available, e.g. on Windows.
+    """
     try:
-        hostname = socket.gethostbyaddr(ip)[0]
-        if hostname and hostname != ip:
-            return hostname
-    except (socket.herror, socket.gaierror):
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except OSError:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+class IcmpProber:
+    """Sends ICMP echo requests to many hosts from one socket and matches the replies."""
+    
+    def __init__(self):
+        self.sock, self.raw = open_icmp_socket()
+        self.sock.setblocking(False)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        # datagram sockets get their identifier from the kernel, raw ones use ours
+        self.identifier = os.getpid() & 0xFFFF
+        self.sequence = 0
+        self.pending = {}  # ip: (sequence, time sent)
+        self.replies = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.sock.fileno(), self.read_replies)
+    
+    async def send(self, ip):
+        """Send an echo request to ip; its reply will be put in self.replies."""
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self.identifier, self.sequence)
+        checksum = icmp_checksum(header + ICMP_PAYLOAD)
+        packet = header[:2] + struct.pack("!H", checksum) + header[4:] + ICMP_PAYLOAD
+        self.pending[ip] = (self.sequence, time.monotonic())
+        try:
+            await self.loop.sock_sendto(self.sock, packet, (ip, 0))
+        except OSError:  # e.g. no route to host
+            del self.pending[ip]
+    
+    def read_replies(self):
+        """Read all waiting ICMP messages and queue (ip, round trip seconds) of the echo replies."""
+        while True:
+            try:
+                data, (ip, _) = self.sock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            if self.raw:
+                data = data[(data[0] & 0x0F) * 4:]  # skip the IP header
+            if len(data) < 8:
+                continue
+            kind, _, _, identifier, sequence = struct.unpack("!BBHHH", data[:8])
+            if kind != ICMP_ECHO_REPLY or (self.raw and identifier != self.identifier):
+                continue
+            expected = self.pending.get(ip)
+            if expected and expected[0] == sequence:
+                del self.pending[ip]
+                self.replies.put_nowait((ip, time.monotonic() - expected[1]))
+    
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+async def icmp_sweep(prober, addresses, timeout=PING_TIMEOUT, window=DEFAULT_WINDOW, rate=DEFAULT_RATE):
+    """
+    Ping addresses from prober's socket and yield (ip, round trip seconds) of each
+    reply as it arrives.
+    
+    Addresses are read lazily, with at most window requests waiting for a reply
+    at once, sent at most rate per second; requests expire after timeout seconds.
+    """
+    addresses = iter(addresses)
+    limiter = RateLimiter(rate)
+    exhausted = False
+    while True:
+        # drop the oldest requests without a reply; pending is in the order they were sent
+        now = time.monotonic()
+        while prober.pending and now - next(iter(prober.pending.values()))[1] > timeout:
+            del prober.pending[next(iter(prober.pending))]
+        while not prober.replies.empty():
+            yield prober.replies.get_nowait()
+        if exhausted and not prober.pending:
+            return
+        
+        if not exhausted and len(prober.pending) < window and limiter.delay() == 0:
+            ip = next(addresses, None)
+            if ip is None:
+                exhausted = True
+            else:
+                limiter.take()
+                await prober.send(ip)
+                await asyncio.sleep(0)  # read the replies that already arrived
+            continue
+        
+        # wait for a reply, the next request to expire or the next request to be allowed
+        waits = []
+        if prober.pending:
+            waits.append(next(iter(prober.pending.values()))[1] + timeout - now)
+        if not exhausted and len(prober.pending) < window:
+            waits.append(limiter.delay())
+        try:
+            yield await asyncio.wait_for(prober.replies.get(), max(min(waits), 0.001))
+        except asyncio.TimeoutError:
+            pass
+
+async def ping_sweep(addresses, executor, window=DEFAULT_WINDOW, rate=DEFAULT_RATE):
+    """Like icmp_sweep, running the ping command in executor's threads; yields (ip, None)."""
+    loop = asyncio.get_running_loop()
+    addresses = iter(addresses)
+    limiter = RateLimiter(rate)
+    running = {}  # future: ip
+    exhausted = False
+    while True:
+        while not exhausted and len(running) < window and limiter.delay() == 0:
+            ip = next(addresses, None)
+            if ip is None:
+                exhausted = True
+            else:
+                limiter.take()
+                running[loop.run_in_executor(executor, ping_host, ip)] = ip
+        if not running:
+            if exhausted:
+                return
+            await asyncio.sleep(max(limiter.delay(), 0.001))
+            continue
+        timeout = None if exhausted or len(running) >= window else max(limiter.delay(), 0.001)
+        done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            ip = running.pop(future)
+            if future.result():
+                yield ip, None
+
+def system_nameservers():
+    """Return the (address, port) of the nameservers in /etc/resolv.conf, or [] without one."""
+    nameservers = []
+    try:
+        with open('/etc/resolv.conf', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver' and ':' not in parts[1]:
+                    nameservers.append((parts[1], DNS_PORT))
+    except OSError:
         pass
+    return nameservers
+
+def ptr_query(query_id, ip):
+    """Build a DNS query for the PTR record of ip."""
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)  # recursion desired, one question
+    name = b"".join(bytes([len(label)]) + label.encode("ascii")
+                    for label in ipaddress.ip_address(ip).reverse_pointer.split("."))
+    return header + name + b"\0" + struct.pack("!HH", DNS_TYPE_PTR, 1)
+
+def read_name(message, offset):
+    """Read a possibly compressed domain name; return it and the offset after it."""
+    labels = []
+    end = None
+    for _ in range(128):  # bounds the pointer loops of a malformed message
+        length = message[offset]
+        if length >= 0xC0:  # pointer to an earlier name
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | message[offset + 1]
+        elif length:
+            labels.append(message[offset + 1:offset + 1 + length].decode("ascii", "replace"))
+            offset += 1 + length
+        else:
+            return ".".join(labels), end if end is not None else offset + 1
+    raise ValueError("DNS name loop")
+
+def parse_ptr_answer(message):
+    """
+    Parse the answer to a PTR query.
+    
+    Returns (query id, hostname or None, seconds to cache it). Addresses without
+    a name are cached as long as the SOA record of the answer allows; a server
+    failure has None for the seconds, as it says nothing about the name.
+    """
+    query_id, flags, questions, answers, authorities, _ = struct.unpack("!HHHHHH", message[:12])
+    offset = 12
+    for _ in range(questions):
+        offset = read_name(message, offset)[1] + 4
+    hostname = None
+    ttl = None
+    for i in range(answers + authorities):
+        _, offset = read_name(message, offset)
+        kind, _, record_ttl, length = struct.unpack("!HHIH", message[offset:offset + 10])
+        offset += 10
+        if i < answers and kind == DNS_TYPE_PTR and hostname is None:
+            hostname = read_name(message, offset)[0]
+            ttl = record_ttl
+        elif i >= answers and kind == DNS_TYPE_SOA and hostname is None:
+            minimum = struct.unpack("!I", message[offset + length - 4:offset + length])[0]
+            ttl = min(record_ttl, minimum)
+        offset += length
+    if hostname is None and flags & 0x0F not in (0, DNS_NXDOMAIN):
+        return query_id, None, None
+    return query_id, hostname, NEGATIVE_CACHE_TTL if ttl is None else ttl
+
+class TtlCache:
+    """Names of addresses with the time they expire, kept between scans in memory and in a JSON file."""
+    
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}  # ip: [hostname or None, expiry as time.time()]
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
     
-    # Method 2: Try mDNS/Bonjour resolution (common on local networks)
+    def get(self, ip):
+        """Return (True, hostname or None) for a cached address, (False, None) otherwise."""
+        entry = self.entries.get(ip)
+        if entry is None or entry[1] < time.time():
+            return False, None
+        return True, entry[0]
+    
+    def put(self, ip, hostname, ttl):
+        self.entries[ip] = [hostname, time.time() + max(ttl, MIN_CACHE_TTL)]
+    
+    def save(self):
+        now = time.time()
+        self.entries = {ip: entry for ip, entry in self.entries.items() if entry[1] >= now}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(".tmp")
+            with open(temporary, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"Could not save the hostname cache: {e}")
+
+ptr_cache = None  # the TtlCache of all scans of this process, loaded on first use
+
+def get_ptr_cache():
+    """Return the hostname cache shared by the scans of this process."""
+    global ptr_cache
+    if ptr_cache is None:
+        ptr_cache = TtlCache()
+    return ptr_cache
+
+def load_hosts():
+    """Read the hosts file into {ip: first name}."""
+    names = {}
     try:
-        # Set a shorter timeout for faster scanning
-        socket.setdefaulttimeout(2)
-        hostname = socket.getfqdn(ip)
-        if hostname and hostname != ip and not hostname.startswith(ip):
+        with open(HOSTS_FILE, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parts = line.split("#", 1)[0].split()
+                if len(parts) >= 2:
+                    names.setdefault(parts[0], parts[1])
+    except OSError:
+        pass
+    return names
+
+hosts_names = None  # the names of the hosts file, loaded on first use
+
+def hosts_name(ip):
+    """Return the name of ip in the hosts file, or None."""
+    global hosts_names
+    if hosts_names is None:
+        hosts_names = load_hosts()
+    return hosts_names.get(ip)
+
+class PtrResolver(asyncio.DatagramProtocol):
+    """
+    Resolves many addresses at once with PTR queries over one UDP socket, answering cached ones from cache.
+    
+    Routers often do not answer PTR queries for their LAN, so the addresses the
+    nameservers say have no name are looked up in the hosts file, then asked for
+    their mDNS name over the same socket, then on Windows for their NetBIOS name.
+    """
+    
+    def __init__(self, cache, nameservers=None):
+        self.cache = cache
+        self.nameservers = nameservers or system_nameservers()
+        self.queries = {}  # query id: (server, future of (hostname, ttl))
+        self.transport = None
+        self.limit = asyncio.Semaphore(DNS_CONCURRENCY)
+    
+    async def open(self):
+        """Open the socket; returns False when there is no nameserver to ask."""
+        if not self.nameservers:
+            return False
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, family=socket.AF_INET)
+        return True
+    
+    def datagram_received(self, data, address):
+        try:
+            query_id, hostname, ttl = parse_ptr_answer(data)
+        except (ValueError, struct.error, IndexError):
+            return
+        query = self.queries.get(query_id)
+        if query and query[0] == (address[0], address[1]) and not query[1].done():
+            query[1].set_result((hostname, ttl))
+    
+    async def query(self, ip, server, timeout):
+        """Ask server for the PTR record of ip; return (hostname, ttl), raises asyncio.TimeoutError or OSError."""
+        query_id = random.getrandbits(16)
+        while query_id in self.queries:
+            query_id = random.getrandbits(16)
+        future = asyncio.get_running_loop().create_future()
+        self.queries[query_id] = (server, future)
+        try:
+            self.transport.sendto(ptr_query(query_id, ip), server)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            del self.queries[query_id]
+    
+    async def local_name(self, ip, executor=None):
+        """Return the name of ip from the hosts file, mDNS or NetBIOS, or None."""
+        hostname = hosts_name(ip)
+        if hostname is None:
+            try:
+                hostname, _ = await self.query(ip, (ip, MDNS_PORT), MDNS_TIMEOUT)
+            except (asyncio.TimeoutError, OSError):
+                pass
+        if hostname is None and platform.system() == "Windows":
+            hostname = await asyncio.get_running_loop().run_in_executor(executor, netbios_name, ip)
+        return hostname
+    
+    async def resolve(self, ip, executor=None):
+        """
+        Return the name of ip, or None if it has none or no nameserver answered.
+        
+        Only a definite answer without a name falls back to local_name, whose
+        result is cached for MIN_CACHE_TTL; a nameserver that did not answer
+        may still know the name next time.
+        """
+        cached, hostname = self.cache.get(ip)
+        if cached:
             return hostname
-    except:
+        if self.transport is None:
+            return None
+        answered = False
+        async with self.limit:
+            for attempt in range(DNS_ATTEMPTS):
+                try:
+                    hostname, ttl = await self.query(ip, self.nameservers[attempt % len(self.nameservers)], DNS_TIMEOUT)
+                except (asyncio.TimeoutError, OSError):
+                    continue
+                if ttl is not None:  # else a server failure, ask the next nameserver
+                    answered = True
+                    break
+        if not answered:
+            return None
+        if hostname is None:
+            hostname, ttl = await self.local_name(ip, executor), MIN_CACHE_TTL
+        self.cache.put(ip, hostname, ttl)
+        return hostname
+    
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+def normalize_mac(mac):
+    """Write a MAC address as six lowercase pairs of hex digits separated by colons."""
+    return ":".join(f"{int(part, 16):02x}" for part in re.split("[-:]", mac))
+
+def read_neighbors():
+    """
+    Read the whole neighbor (ARP) table of the system at once.
+    
+    Returns {ip: MAC address} of the complete entries: from /proc/net/arp on
+    Linux, else from a single 'arp -a' command.
+    """
+    neighbors = {}
+    if os.path.exists(NEIGHBOR_FILE):
+        try:
+            with open(NEIGHBOR_FILE) as f:
+                next(f)  # header
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 4 and int(parts[2], 16) & ATF_COM and parts[3] != "00:00:00:00:00:00":
+                        neighbors[parts[0]] = parts[3].lower()
+        except (OSError, ValueError, StopIteration):
+            pass
+        return neighbors
+    
+    try:
+        windows = platform.system() == "Windows"
+        result = subprocess.run(['arp', '-a'] if windows else ['arp', '-an'],
+                                capture_output=True, text=True, timeout=5)
+        pattern = WINDOWS_ARP_LINE if windows else BSD_ARP_LINE
+        for line in result.stdout.split('\n'):
+            match = pattern.match(line)
+            if match:
+                neighbors[match.group(1)] = normalize_mac(match.group(2))
+    except (OSError, subprocess.TimeoutExpired, subprocess.SubprocessError):
         pass
-    finally:
-        socket.setdefaulttimeout(None)
+    return neighbors
+
+class NeighborTable:
+    """
+    The neighbor (ARP) table of the system, read in bulk and indexed by IP address.
+    
+    The table is read in an executor, since without /proc/net/arp that runs a command,
+    and a read in progress is shared by every caller that needs it.
+    """
     
+    def __init__(self):
+        self.macs = {}
+        self.read_time = None
+        self.reading = None  # future of the read in progress
+    
+    async def refresh(self, executor=None):
+        if self.reading is None:
+            self.reading = asyncio.get_running_loop().run_in_executor(executor, read_neighbors)
+            self.reading.add_done_callback(self._read)
+        await asyncio.shield(self.reading)
+    
+    def _read(self, future):
+        self.reading = None
+        if not future.cancelled() and future.exception() is None:
+            self.macs = future.result()
+            self.read_time = time.monotonic()
+    
+    async def lookup(self, ip, executor=None):
+        """Return the MAC address of ip, or None; re-reads the table at most every NEIGHBOR_REFRESH seconds."""
+        if ip not in self.macs and (self.read_time is None or time.monotonic() - self.read_time > NEIGHBOR_REFRESH):
+            await self.refresh(executor)
+        return self.macs.get(ip)
+
+def load_vendors():
+    """Read the first MAC prefix database found into {'AABBCC': vendor}."""
+    vendors = {}
+    for path in OUI_FILES:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    match = OUI_LINE.match(line)
+                    if match:
+                        vendor = match.group(4).split("\t")[-1].strip()
+                        vendors.setdefault("".join(match.group(1, 2, 3)).upper(), vendor)
+        except OSError:
+            continue
+        if vendors:
+            break
+    return vendors
+
+mac_vendors = None  # the MAC prefix database, loaded on first use
+
+def mac_vendor(mac):
+    """Return the vendor of a MAC address, or None if it is unknown."""
+    global mac_vendors
+    if mac is None:
+        return None
+    if int(mac[:2], 16) & 0x02:  # locally administered, e.g. randomized by phones for privacy
+        return "Private address"
+    if mac_vendors is None:
+        mac_vendors = load_vendors()
+    return mac_vendors.get(mac.replace(":", "")[:6].upper())
+
+def netbios_name(ip):
+    """Return the NetBIOS name of ip on Windows networks, or None."""
     # Method 3: Try NetBIOS name resolution (Windows networks)
     if platform.system() == "Windows":
         try:
@@ -83,67 +604,138 @@ def resolve_hostname(ip):
                             return parts[0]
         except (subprocess.TimeoutExpired, subprocess.SubprocessError):
             pass
-    
-    # Method 4: Try ARP table lookup for MAC address info
-    try:
-        if platform.system() == "Windows":
-            result = subprocess.run(['arp', '-a', ip], 
-                                  capture_output=True, text=True, timeout=2)
-        else:
-            result = subprocess.run(['arp', '-n', ip], 
-                                  capture_output=True, text=True, timeout=2)
-        
-        if result.returncode == 0 and result.stdout.strip():
-            # If we have ARP info, the device exists but no hostname available
-            return "No hostname (device found)"
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError):
-        pass
+    return None
+
+def unnamed_host(ip, neighbors=None):
+    """Describe a host without a name, using the neighbor (ARP) table."""
+    # Method 4: Look the host up in the neighbor (ARP) table, read once for a whole scan
+    if neighbors is None:
+        neighbors = read_neighbors()
+    if ip in neighbors:
+        # If we have ARP info, the device exists but no hostname available
+        return "No hostname (device found)"
     
     return "Unknown"
 
-def scan_host(ip):
-    """Scan a single host and return results if alive."""
-    if ping_host(ip):
-        hostname = resolve_hostname(ip)
-        return (ip, hostname)
+def local_hostname(ip, neighbors=None):
+    """Find a name or sign of a host without DNS, using NetBIOS and the neighbor (ARP) table."""
+    return netbios_name(ip) or unnamed_host(ip, neighbors)
+
+def system_hostname(ip):
+    """Return the name of ip from the system resolver, or None."""
+    # Method 1: Standard reverse lookup, which also reads the hosts file and, with
+    # nss-mdns, asks the devices themselves for their .local names
+    try:
+        hostname = socket.gethostbyaddr(ip)[0]
+        if hostname and hostname != ip:
+            return hostname
+    except (socket.herror, socket.gaierror):
+        pass
     return None
 
-def scan_network(network_base="auto", max_workers=256):
+def resolve_hostname(ip, neighbors=None):
+    """Resolve hostname for an IP address using multiple methods."""
+    return system_hostname(ip) or local_hostname(ip, neighbors)
+
+async def scan_hosts(networks, max_workers=256, timeout=PING_TIMEOUT, window=DEFAULT_WINDOW, rate=DEFAULT_RATE):
+    """
+    Yield (ip, hostname, MAC address, vendor) of each active host in networks as soon
+    as it is found and resolved. Right after the sweep, hosts that are in the neighbor
+    table but did not reply to ping are added too.
     """
-    Scan a Class C network for active devices.
+    loop = asyncio.get_running_loop()
+    found = asyncio.Queue()
+    resolving = set()
+    replied = set()
+    addresses = network_hosts(networks)
+    neighbors = NeighborTable()
+    resolver = PtrResolver(get_ptr_cache())
+    if not await resolver.open():
+        print("No nameserver in /etc/resolv.conf, resolving hostnames with the system resolver")
+    
+    async def resolve(ip):
+        mac = await neighbors.lookup(ip, executor)
+        if resolver.transport is None:
+            hostname = await loop.run_in_executor(executor, resolve_hostname, ip, neighbors.macs)
+        else:
+            hostname = await resolver.resolve(ip, executor) or unnamed_host(ip, neighbors.macs)
+        await found.put((ip, hostname, mac, mac_vendor(mac)))
+    
+    def start_resolving(ip):
+        task = asyncio.create_task(resolve(ip))
+        resolving.add(task)
+        task.add_done_callback(resolving.discard)
+    
+    async def sweep():
+        prober = None
+        try:
+            prober = IcmpProber()
+            hosts = icmp_sweep(prober, addresses, timeout, window, rate)
+        except OSError as e:
+            print(f"No ICMP socket ({e}), running the ping command for each host")
+            hosts = ping_sweep(addresses, executor, min(window, max_workers), rate)
+        try:
+            async for ip, _ in hosts:
+                replied.add(ip)
+                start_resolving(ip)
+            # the sweep made the system resolve the address of every host on the local
+            # networks, so the table now also lists the devices that ignore ping
+            await neighbors.refresh(executor)
+            for ip in neighbors.macs:
+                if ip not in replied and any(ipaddress.IPv4Address(ip) in n for n in networks):
+                    start_resolving(ip)
+            await asyncio.gather(*resolving)
+        finally:
+            if prober:
+                prober.close()
+            await found.put(None)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            sweeper = asyncio.create_task(sweep())
+            while (host := await found.get()) is not None:
+                yield host
+            await sweeper
+    finally:
+        resolver.close()
+        resolver.cache.save()
+
+def scan_network(networks="auto", max_workers=256, timeout=PING_TIMEOUT, window=DEFAULT_WINDOW, rate=DEFAULT_RATE):
+    """
+    Scan networks for active devices, printing each one as soon as it is found.
     
     Args:
-        network_base: Network base (e.g., "192.168.1.") or "auto" for auto-detection
-        max_workers: Number of concurrent threads for scanning
+        networks: List of IPv4Network, a string for parse_networks (e.g. "192.168.1.0/24 10.0.0.0/16"
+                  or "192.168.1.") or "auto" for the local network
+        max_workers: Number of concurrent threads resolving hostnames
+        timeout: Seconds to wait for the reply of each host
+        window: Number of hosts probed at once
+        rate: Echo requests per second, or None for no limit
     """
     
-    if network_base == "auto":
-        network_base = get_local_network()
+    if networks == "auto":
+        networks = [get_local_network()]
+    elif isinstance(networks, str):
+        networks = parse_networks(networks)
     
-    print(f"Scanning network {network_base}0/24...")
-    print("This may take a few moments...")
+    total = sum(max(n.num_addresses - 2, 1) for n in networks)
+    print(f"Scanning {', '.join(str(n) for n in networks)} ({total} addresses)...")
+    print(f"{'IP Address':<15} | {'MAC Address':<17} | {'Vendor':<24} | {'Hostname'}")
     
     active_hosts = []
     
-    # Create list of all IPs to scan (1-254, excluding 0 and 255)
-    ip_list = [f"{network_base}{i}" for i in range(1, 255)]
+    async def scan():
+        async for host in scan_hosts(networks, max_workers, timeout, window, rate):
+            print(format_host(*host), flush=True)
+            active_hosts.append(host)
     
-    # Use ThreadPoolExecutor for concurrent scanning
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all scanning tasks
-        future_to_ip = {executor.submit(scan_host, ip): ip for ip in ip_list}
-        
-        # Collect results as they complete
-        completed = 0
-        for future in as_completed(future_to_ip):
-            print(".", end="", flush="True")
-            result = future.result()
-            if result:
-                active_hosts.append(result)
-    
-        print()
+    asyncio.run(scan())
     return active_hosts
 
+def format_host(ip, hostname, mac, vendor):
+    """Format a host as a row of the results table."""
+    return f"{ip:<15} | {mac or '-':<17} | {(vendor or '-')[:24]:<24} | {hostname}"
+
 def print_results(active_hosts):
     """Print the results in a formatted table."""
     if not active_hosts:
@@ -151,17 +743,17 @@ def print_results(active_hosts):
         return
     
     print(f"\nFound {len(active_hosts)} active host(s):")
-    print("-" * 60)
-    print(f"{'IP Address':<15} | {'Hostname'}")
-    print("-" * 60)
+    print("-" * 90)
+    print(f"{'IP Address':<15} | {'MAC Address':<17} | {'Vendor':<24} | {'Hostname'}")
+    print("-" * 90)
     
     # Sort by IP address
     active_hosts.sort(key=lambda x: ipaddress.IPv4Address(x[0]))
     
-    for ip, hostname in active_hosts:
-        print(f"{ip:<15} | {hostname}")
+    for host in active_hosts:
+        print(format_host(*host))
     
-    print("-" * 60)
+    print("-" * 90)
 
 def get_network_info():
     """Get additional network information to help with hostname resolution."""
@@ -201,34 +793,41 @@ def get_network_info():
 
 def main():
     """Main function."""
-    print("Class C Network Scanner")
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[1])
+    parser.add_argument('networks', nargs='*', metavar='NETWORK',
+                        help="networks to scan, e.g. 192.168.1.0/24 (default: ask, or the local network)")
+    parser.add_argument('--timeout', type=float, default=PING_TIMEOUT, help='seconds to wait for each reply')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='hosts probed at once')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help='echo requests per second, 0 for no limit')
+    args = parser.parse_args()
+    
+    print("Network Scanner")
     print("=" * 30)
     
     # Show network configuration info
     get_network_info()
     
-    # Get network to scan
-    network_input = input("Enter network base (e.g., '192.168.1.') or press Enter for auto-detection: ").strip()
+    # Get networks to scan
+    if args.networks:
+        network_input = " ".join(args.networks)
+    else:
+        network_input = input("Enter networks (e.g., '192.168.1.0/24 10.0.0.0/16' or '192.168.1.') "
+                              "or press Enter for auto-detection: ").strip()
     
     if not network_input:
-        network_base = "auto"
+        networks = "auto"
     else:
-        # Validate input format
-        if not network_input.endswith('.'):
-            network_input += '.'
-        
-        # Basic validation
-        parts = network_input.rstrip('.').split('.')
-        if len(parts) != 3 or not all(part.isdigit() and 0 <= int(part) <= 255 for part in parts):
-            print("Invalid network format. Using auto-detection...")
-            network_base = "auto"
-        else:
-            network_base = network_input
+        try:
+            networks = parse_networks(network_input)
+        except ValueError as e:
+            print(f"Invalid network format ({e}). Using auto-detection...")
+            networks = "auto"
     
     try:
         # Perform the scan
         start_time = time.time()
-        active_hosts = scan_network(network_base)
+        active_hosts = scan_network(networks, timeout=args.timeout, window=args.window, rate=args.rate or None)
         scan_time = time.time() - start_time
         
         # Display results
@@ -236,7 +835,7 @@ def main():
         print(f"\nScan completed in {scan_time:.2f} seconds")
         
         # Show troubleshooting info if many unknowns
-        unknown_count = sum(1 for _, hostname in active_hosts if hostname == "Unknown")
+        unknown_count = sum(1 for _, hostname, _, _ in active_hosts if hostname == "Unknown")
         if unknown_count > len(active_hosts) * 0.7:  # If >70% are unknown
             troubleshoot_hostname_issues()
         
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+micro:bit Simulator for speedmonitor
+Runs speedmonitor.py (or speedmonitor0.py) on the host with stand-ins for the microbit,
+micropython and utime modules, replaying recorded or synthetic light-sensor traces on a
+controlled clock, and reports the speeds, sampling rate and latency of each reading.
+
+    python microbit_sim.py --speeds 20 80 150 300
+    python microbit_sim.py --trace capture.csv
+    python microbit_sim.py --gates 0 150 300 --speeds 40 60 --accel 10
+"""
+
+import argparse
+import bisect
+import importlib
+import random
+import re
+import sys
+import time
+import types
+from array import array
+
+TICKS_PERIOD = 1 << 30  # utime ticks wrap around like on the device
+DEFAULT_READ_US = 40  # simulated duration of one read_analog() call
+MEM_FREE = 60000  # bytes reported by gc.mem_free(), about what a micro:bit V2 has after loading a program
+DEFAULT_STEP_US = 20  # resolution of synthetic traces
+DEFAULT_SPEEDS = (20, 50, 80, 120, 150, 200, 250, 290)  # km/h, readings of 300 and up are discarded
+DEFAULT_MAX_ERROR = 1.0  # percent, or 1 km/h since readings are shown as whole numbers
+LIT_LEVEL = 700
+DARK_LEVEL = 80
+NOISE = 15
+EDGE_US = 300  # time for a sensor to go from lit to dark when shaded by hand
+BEAM_WIDTH = 0.002  # meters, a train front shades a sensor over the time it takes to cross it
+TRAIN_LENGTH = 0.25  # meters, a short H0 locomotive
+H0_SCALE = 87
+CALIBRATION_SHADE = (0.2, 0.4)  # seconds when the sensors are shaded by hand during calibration
+BUTTON_PRESSES = (0.1, 0.6)  # seconds when button B is pressed: start and end of calibration
+FIRST_TRAIN = 1.5  # seconds
+TRAIN_GAP = 5.0  # seconds from a train leaving the sensors to the next one, enough for the reading to scroll
+SCROLL_COLUMNS_PER_CHAR = 6  # a 5 pixel wide character and one blank column
+
+
+class TraceEnd(Exception):
+    """Raised by the simulated board when the clock runs past the end of its trace."""
+
+
+class Clock:
+    """Microsecond clock of the simulated board.
+
+    In virtual mode, time only advances by 'read_us' on each analog read and by the
+    time given to sleep(), so runs are deterministic. In real-time mode it follows
+    the host clock times 'rate', so the host speed of the sampling loop shows up in
+    the results; sleep() still returns at once and just adds to the clock.
+    """
+
+    def __init__(self, end_us, read_us=DEFAULT_READ_US, realtime=False, rate=1.0, start_ticks=0):
+        self.end_us = end_us
+        self.read_us = read_us
+        self.realtime = realtime
+        self.rate = rate
+        self.start_ticks = start_ticks  # ticks_us() at time 0, to test wrap-around
+        self.virtual_us = 0
+        self.host_start = time.perf_counter_ns()
+
+    def now(self):
+        if self.realtime:
+            host_us = (time.perf_counter_ns() - self.host_start) / 1000 * self.rate
+            return int(host_us) + self.virtual_us
+        return self.virtual_us
+
+    def advance(self, us):
+        self.virtual_us += us
+        if self.now() > self.end_us:
+            raise TraceEnd()
+
+    def read(self):
+        """Account for one analog read and return the time of the sample."""
+        if self.realtime:
+            now = self.now()
+            if now > self.end_us:
+                raise TraceEnd()
+            return now
+        self.advance(self.read_us)
+        return self.virtual_us
+
+    def ticks_us(self):
+        return (self.start_ticks + self.now()) % TICKS_PERIOD
+
+    def ticks_ms(self):
+        return (self.start_ticks // 1000 + self.now() // 1000) % TICKS_PERIOD
+
+
+def ticks_diff(end, start):
+    """Signed difference of two tick values, like utime.ticks_diff()."""
+    return (end - start + TICKS_PERIOD // 2) % TICKS_PERIOD - TICKS_PERIOD // 2
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) % TICKS_PERIOD
+
+
+class Trace:
+    """Light levels of the sensor pins, sampled every 'step_us' microseconds."""
+
+    def __init__(self, step_us, pins):
+        self.step_us = step_us
+        self.pins = pins  # one array('H') of ADC values per pin
+        # (time_us, speed_kmh, first_pin, gap_us) of the trains of a synthetic trace,
+        # where gap_us is the time from the first sensor to the last
+        self.trains = []
+
+    @property
+    def duration_us(self):
+        return len(self.pins[0]) * self.step_us
+
+    def value(self, pin, time_us):
+        values = self.pins[pin]
+        return values[min(time_us // self.step_us, len(values) - 1)]
+
+
+def load_trace(filename, step_us=DEFAULT_STEP_US):
+    """Read a trace from a CSV file of 't_us,pin0,pin1' lines, resampled every 'step_us'."""
+    times, pin0, pin1 = [], [], []
+    with open(filename) as f:
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) != 3 or not parts[0].lstrip('-').isdigit():
+                continue  # header, blank or other serial output
+            times.append(int(parts[0]))
+            pin0.append(int(parts[1]))
+            pin1.append(int(parts[2]))
+    if not times:
+        raise ValueError(f"no samples in {filename}")
+    start = times[0]
+    times = [t - start for t in times]
+    pins = (array('H'), array('H'))
+    for t in range(0, times[-1] + step_us, step_us):
+        i = max(bisect.bisect_right(times, t) - 1, 0)
+        pins[0].append(pin0[i])
+        pins[1].append(pin1[i])
+    return Trace(step_us, pins)
+
+
+def travel_time(distance, speed, accel=0.0):
+    """Seconds to travel 'distance' meters from 'speed' m/s with a constant 'accel' in m/s/s."""
+    if not accel:
+        return distance / speed
+    discriminant = speed * speed + 2 * accel * distance
+    if discriminant < 0:
+        raise ValueError(f"a train at {speed} m/s slowing down by {-accel} m/s/s stops within {distance} m")
+    return (discriminant ** 0.5 - speed) / accel
+
+
+def synthetic_trace(speeds, positions, train_length=TRAIN_LENGTH, accel=0.0, scale=H0_SCALE,
+                    step_us=DEFAULT_STEP_US, seed=0, drift=0.0, gap=TRAIN_GAP):
+    """Build a trace with one train for each speed in km/h, alternating directions.
+
+    'positions' are the meters along the track of the sensors on pin0, pin1...
+    Trains reach the first sensor at the given speed and change it by 'accel'
+    km/h per second. The trace starts with the sensors lit, shades them by hand
+    during calibration and then passes the trains, each one 'gap' seconds
+    after the previous one left. Each train is recorded in Trace.trains with
+    its average speed from the first sensor to the last. From the first train
+    on, the lit level changes steadily by 'drift' percent until the end, as the
+    room light would.
+    """
+    rng = random.Random(seed)
+    model_accel = accel / 3.6 / scale  # m/s/s
+    span = max(positions) - min(positions)
+    trains = []  # start_us, kmh and the (pin, dark from us, dark to us, edge us) of each train
+    start_us = int(FIRST_TRAIN * 1e6)
+    for i, kmh in enumerate(speeds):
+        model_speed = kmh / 3.6 / scale  # m/s
+        first_position = min(positions) if i % 2 == 0 else max(positions)
+        shades = []
+        for pin, position in enumerate(positions):
+            distance = abs(position - first_position)
+            front = start_us + int(travel_time(distance, model_speed, model_accel) * 1e6)
+            rear = start_us + int(travel_time(distance + train_length, model_speed, model_accel) * 1e6)
+            local_speed = (model_speed * model_speed + 2 * model_accel * distance) ** 0.5
+            shades.append((pin, front, rear, int(BEAM_WIDTH / local_speed * 1e6)))
+        average = span / travel_time(span, model_speed, model_accel) * 3.6 * scale
+        trains.append((start_us, average, shades))
+        start_us = max(s[2] for s in shades) + int(gap * 1e6)
+    steps = start_us // step_us
+    darkness = [[0.0] * steps for _ in positions]  # 0 lit, 1 dark
+
+    def shade(pin, start_us, end_us, edge_us=EDGE_US):
+        first = max(start_us // step_us, 0)
+        last = min(end_us // step_us, steps)
+        edge = max(edge_us / step_us, 1)
+        for i in range(first, last):
+            darkness[pin][i] = max(darkness[pin][i], min((i - first) / edge, (last - i) / edge, 1.0))
+
+    for pin in range(len(positions)):
+        shade(pin, int(CALIBRATION_SHADE[0] * 1e6), int(CALIBRATION_SHADE[1] * 1e6))
+    trace_trains = []
+    for start_us, kmh, shades in trains:
+        # the front reaches each sensor at 'front' and the rear leaves it at 'rear'
+        for pin, front, rear, edge_us in shades:
+            shade(pin, front - edge_us // 2, rear + edge_us // 2, edge_us)
+        first_pin = min(shades, key=lambda s: s[1])[0]
+        gap_us = max(s[1] for s in shades) - start_us
+        trace_trains.append((start_us, kmh, first_pin, gap_us))
+
+    drift_start = int(FIRST_TRAIN * 1e6) // step_us
+    lit = [LIT_LEVEL * (1 + drift / 100 * max(0, i - drift_start) / (steps - drift_start)) for i in range(steps)]
+    pins = tuple(array('H') for _ in positions)
+    for pin in range(len(positions)):
+        pins[pin].extend(max(0, round(lit[i] - (lit[i] - DARK_LEVEL) * d + rng.gauss(0, NOISE)))
+                         for i, d in enumerate(darkness[pin]))
+    trace = Trace(step_us, pins)
+    trace.trains = trace_trains
+    return trace
+
+
+class Pin:
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+
+    def read_analog(self):
+        board = self.board
+        board.reads += 1
+        now = board.clock.read()
+        if self.index >= len(board.trace.pins):
+            return LIT_LEVEL
+        return board.trace.value(self.index, now)
+
+
+class Button:
+    def __init__(self, board, presses):
+        self.board = board
+        self.presses = sorted(int(p * 1e6) for p in presses)  # microseconds
+        self.next_press = 0
+
+    def was_pressed(self):
+        now = self.board.clock.now()
+        pressed = False
+        while self.next_press < len(self.presses) and self.presses[self.next_press] <= now:
+            self.next_press += 1
+            pressed = True
+        return pressed
+
+    def is_pressed(self):
+        now = self.board.clock.now()
+        return any(p <= now < p + 100_000 for p in self.presses)
+
+
+class Display:
+    """5x5 display that logs what is shown; scroll() takes as long as on the device."""
+
+    def __init__(self, board):
+        self.board = board
+
+    def show(self, image, delay=400, wait=True, loop=False, clear=False):
+        self.board.log('show', image)
+
+    def scroll(self, text, delay=150, wait=True, loop=False, monospace=False):
+        self.board.log('scroll', str(text))
+        if wait:
+            self.board.clock.advance((len(str(text)) * SCROLL_COLUMNS_PER_CHAR + 5) * delay * 1000)
+
+    def clear(self):
+        self.board.log('clear', None)
+
+    def set_pixel(self, x, y, value):
+        pass
+
+    def get_pixel(self, x, y):
+        return 0
+
+
+class Image:
+    YES = 'YES'
+    NO = 'NO'
+    ARROW_W = 'ARROW_W'
+    ARROW_E = 'ARROW_E'
+    HAPPY = 'HAPPY'
+    SAD = 'SAD'
+
+
+class Board:
+    """Simulated micro:bit: pins replaying 'trace', buttons, display, serial and clock."""
+
+    def __init__(self, trace, read_us=DEFAULT_READ_US, realtime=False, rate=1.0, start_ticks=0,
+                 button_a_presses=(), button_b_presses=BUTTON_PRESSES, mem_free=MEM_FREE):
+        self.trace = trace
+        self.mem_free = mem_free
+        self.clock = Clock(trace.duration_us, read_us, realtime, rate, start_ticks)
+        self.pins = [Pin(self, i) for i in range(3)]
+        self.display = Display(self)
+        self.button_a = Button(self, button_a_presses)
+        self.button_b = Button(self, button_b_presses)
+        self.reads = 0
+        self.events = []  # (time_us, kind, value) of display changes and serial output
+
+    def log(self, kind, value):
+        self.events.append((self.clock.now(), kind, value))
+
+    def print(self, *args, sep=' ', end='\n'):
+        self.log('print', sep.join(str(a) for a in args))
+
+    def sleep(self, ms):
+        self.clock.advance(int(ms * 1000))
+
+    def modules(self):
+        """Stand-ins for the modules imported by the programs."""
+        microbit = types.ModuleType('microbit')
+        microbit.pin0, microbit.pin1, microbit.pin2 = self.pins
+        microbit.display = self.display
+        microbit.button_a = self.button_a
+        microbit.button_b = self.button_b
+        microbit.Image = Image
+        microbit.sleep = self.sleep
+        microbit.running_time = lambda: self.clock.now() // 1000
+
+        micropython = types.ModuleType('micropython')
+        micropython.const = lambda value: value
+
+        utime = types.ModuleType('utime')
+        utime.ticks_us = self.clock.ticks_us
+        utime.ticks_ms = self.clock.ticks_ms
+        utime.ticks_diff = ticks_diff
+        utime.ticks_add = ticks_add
+        utime.sleep_ms = self.sleep
+        utime.sleep_us = lambda us: self.clock.advance(us)
+
+        gc = types.ModuleType('gc')
+        gc.collect = lambda: None
+        gc.mem_free = lambda: self.mem_free
+        return {'microbit': microbit, 'micropython': micropython, 'utime': utime, 'gc': gc}
+
+
+def load_program(board, name='speedmonitor'):
+    """Import program 'name' wired to 'board', without running its main()."""
+    modules = board.modules()
+    saved = {n: sys.modules.get(n) for n in modules}
+    sys.modules.update(modules)
+    sys.modules.pop(name, None)
+    try:
+        program = importlib.import_module(name)
+    finally:
+        for n, module in saved.items():
+            if module is None:
+                del sys.modules[n]
+            else:
+                sys.modules[n] = module
+        sys.modules.pop(name, None)
+    program.print = board.print
+    return program
+
+
+def run(board, name='speedmonitor', **settings):
+    """Run the main() of program 'name' on 'board' until its trace ends; return the program.
+
+    'settings' replace module constants of the program, e.g. GATE_POSITIONS=(0, 64, 300).
+    """
+    program = load_program(board, name)
+    for setting, value in settings.items():
+        setattr(program, setting, value)
+    try:
+        program.main()
+    except TraceEnd:
+        pass
+    return program
+
+
+def readings(board):
+    """Return the speeds measured by the program, as (time_us, km/h) pairs.
+
+    Uses the telemetry lines, which keep a decimal, and the whole km/h shown on
+    the display for programs that do not print them.
+    """
+    emitted = []
+    shown = []
+    for time_us, kind, value in board.events:
+        if kind == 'print':
+            match = re.fullmatch(r'v,\d+,[RL],\d+,(\d+(?:\.\d+)?)', value)
+            if match:
+                emitted.append((time_us, float(match.group(1))))
+        elif kind == 'scroll':
+            match = re.fullmatch(r'(\d+)km/h', value)
+            if match:
+                shown.append((time_us, int(match.group(1))))
+    return emitted or shown
+
+
+def sample_rates(board):
+    """Return the sampling rates printed by the program, in samples per second."""
+    result = []
+    for _, kind, value in board.events:
+        match = re.fullmatch(r'(\d+) samples/s', value) if kind == 'print' else None
+        if match:
+            result.append(int(match.group(1)))
+    return result
+
+
+def trap_reports(board):
+    """Return the trains timed by the multi-gate speed trap, as (direction, km/h, km/h per s, mm) tuples."""
+    result = []
+    for _, kind, value in board.events:
+        if kind == 'print' and value.startswith('t,'):
+            _, _, direction, kmh, acceleration, length = value.split(',')
+            result.append((direction, float(kmh), float(acceleration), float(length)))
+    return result
+
+
+def activity(board):
+    """Return the activity reports of the program, as (percent of time at full rate, wake ups) pairs."""
+    result = []
+    for _, kind, value in board.events:
+        match = re.fullmatch(r'a,\d+,(\d+),(\d+)', value) if kind == 'print' else None
+        if match:
+            result.append((int(match.group(1)), int(match.group(2))))
+    return result
+
+
+def match_trains(trace, board):
+    """Pair each synthetic train with the reading shown after it passed, if any.
+
+    Returns (speed_kmh, measured_kmh or None, latency_us or None) tuples, where the
+    latency is the time from the front reaching the last sensor to the reading;
+    it can be slightly negative, since the sensor may go dark before the front is
+    right above it.
+    """
+    shown = readings(board)
+    results = []
+    for i, (start_us, kmh, _, gap_us) in enumerate(trace.trains):
+        second_edge = start_us + gap_us
+        next_start = trace.trains[i + 1][0] if i + 1 < len(trace.trains) else float('inf')
+        reading = next(((t, v) for t, v in shown if start_us <= t < next_start), None)
+        if reading is None:
+            results.append((kmh, None, None))
+        else:
+            results.append((kmh, reading[1], reading[0] - second_edge))
+    return results
+
+
+def print_results(results, rates):
+    """Print the results in a formatted table."""
+    print(f"{'Speed':>7} {'Measured':>9} {'Error':>8} {'Latency':>9}")
+    print("-" * 36)
+    for kmh, measured, latency in results:
+        if measured is None:
+            print(f"{kmh:>7g} {'-':>9} {'-':>8} {'-':>9}")
+        else:
+            error = (measured - kmh) / kmh * 100
+            print(f"{kmh:>7g} {measured:>9g} {error:>+7.2f}% {latency / 1000:>7.1f}ms")
+    if rates:
+        print(f"\nSampling rate: {min(rates)}-{max(rates)} samples/s")
+
+
+def print_trap_reports(reports):
+    """Print the trains timed by the speed trap in a formatted table."""
+    print(f"\n{'Dir':>3} {'km/h':>7} {'km/h/s':>7} {'Length':>8}")
+    print("-" * 28)
+    for direction, kmh, acceleration, length in reports:
+        print(f"{direction:>3} {kmh:>7.1f} {acceleration:>+7.2f} {length:>6.0f}mm")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[1])
+    parser.add_argument('--program', default='speedmonitor', help='program module to run')
+    parser.add_argument('--speeds', type=float, nargs='+', default=DEFAULT_SPEEDS,
+                        help='km/h of the trains of the synthetic trace')
+    parser.add_argument('--trace', metavar='FILE', help="replay a CSV trace of 't_us,pin0,pin1' lines instead")
+    parser.add_argument('--gates', type=float, nargs='+', metavar='MM',
+                        help="positions of the sensors in mm, setting the program's GATE_POSITIONS")
+    parser.add_argument('--accel', type=float, default=0.0, help='km/h per second of the synthetic trains')
+    parser.add_argument('--length', type=float, default=TRAIN_LENGTH * 1000, help='mm of the synthetic trains')
+    parser.add_argument('--read-us', type=int, default=DEFAULT_READ_US,
+                        help='simulated microseconds per analog read')
+    parser.add_argument('--realtime', action='store_true',
+                        help='follow the host clock, so the host speed of the loop is measured')
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help='simulated microseconds per host microsecond with --realtime')
+    parser.add_argument('--mem-free', type=int, default=MEM_FREE,
+                        help='bytes reported by gc.mem_free(), e.g. 6000 for a micro:bit V1')
+    parser.add_argument('--start-ticks', type=int, default=0,
+                        help='initial ticks_us() value, e.g. 1073000000 to cross the wrap-around')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic sensor noise')
+    parser.add_argument('--drift', type=float, default=0.0,
+                        help='percent change of the synthetic lit level over the trace, like the room light')
+    parser.add_argument('--gap', type=float, default=TRAIN_GAP,
+                        help='seconds between a synthetic train leaving the sensors and the next one')
+    parser.add_argument('--max-error', type=float, default=DEFAULT_MAX_ERROR,
+                        help='percent speed error reported as a failure')
+    args = parser.parse_args()
+
+    program = load_program(Board(Trace(DEFAULT_STEP_US, (array('H', [0]), array('H', [0])))), args.program)
+    settings = {}
+    if args.gates:
+        if len(args.gates) > len(getattr(program, 'GATE_PINS', ())):
+            parser.error(f"{args.program} has no more than {len(getattr(program, 'GATE_PINS', ()))} gates")
+        settings['GATE_POSITIONS'] = tuple(args.gates)
+        positions = [p / 1000 for p in args.gates]
+    else:
+        positions = [0, program.SENSOR_DISTANCE]
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.speeds, positions, args.length / 1000, args.accel,
+                                seed=args.seed, drift=args.drift, gap=args.gap)
+
+    board = Board(trace, args.read_us, args.realtime, args.rate, args.start_ticks, mem_free=args.mem_free)
+    start = time.perf_counter()
+    run(board, args.program, **settings)
+    seconds = time.perf_counter() - start
+    print(f"Simulated {trace.duration_us / 1e6:.1f}s with {board.reads} analog reads in {seconds:.2f}s")
+    reports = activity(board)
+    if reports:
+        print(f"Active {min(p for p, _ in reports)}-{max(p for p, _ in reports)}% of the time, "
+              f"{sum(w for _, w in reports)} wake up(s)")
+    print()
+
+    if not trace.trains:
+        for time_us, kmh in readings(board):
+            print(f"{time_us / 1e6:>9.3f}s {kmh:>5} km/h")
+        return
+
+    results = match_trains(trace, board)
+    print_results(results, sample_rates(board))
+    if trap_reports(board):
+        print_trap_reports(trap_reports(board))
+    failures = sum(1 for kmh, measured, _ in results
+                   if measured is None or abs(measured - kmh) > max(kmh * args.max_error / 100, 1))
+    if failures:
+        print(f"\n{failures} reading(s) missing or off by more than {args.max_error}%")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
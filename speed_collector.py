@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Speed Reading Collector
+Reads the telemetry lines of speedmonitor.py from a serial port and stores the
+readings in a local database, indexed by the DCC address of the locomotive.
+
+    python speed_collector.py --port /dev/ttyACM0 --address 47 --step 14
+    python speed_collector.py --simulate 5 --address 47
+    python speed_collector.py --list
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import sys
+import termios
+import time
+import tty
+from pathlib import Path
+
+DEFAULT_PORT = '/dev/ttyACM0'  # micro:bit USB serial on Linux
+DEFAULT_BAUD = 115200
+DEFAULT_DB = 'speeds.db'
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+LOCOMOTIVES_FILE = Path(__file__).parent / 'rolling-stock' / 'locomotivas-dcc.md'
+SENSOR_DISTANCE = 64 / 1000  # meters, as in speedmonitor.py, for simulated readings
+H0_SCALE = 87
+
+# v,<device ms>,<R or L>,<dt microseconds>,<km/h>
+READING_LINE = re.compile(r'v,(\d+),([RL]),(\d+),(\d+(?:\.\d+)?)')
+MARKDOWN_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS locomotives (
+    address INTEGER PRIMARY KEY,
+    manufacturer TEXT,
+    model TEXT,
+    prototype TEXT
+);
+CREATE TABLE IF NOT EXISTS readings (
+    id INTEGER PRIMARY KEY,
+    address INTEGER NOT NULL,
+    step INTEGER,
+    received REAL NOT NULL,
+    device_ms INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    dt_us INTEGER NOT NULL,
+    kmh REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS readings_address ON readings (address, step);
+"""
+
+
+def parse_reading(line):
+    """Return a reading dict for a telemetry line, or None for any other output."""
+    match = READING_LINE.fullmatch(line.strip())
+    if not match:
+        return None
+    device_ms, direction, dt_us, kmh = match.groups()
+    return {
+        'received': time.time(),
+        'device_ms': int(device_ms),
+        'direction': direction,
+        'dt_us': int(dt_us),
+        'kmh': float(kmh),
+    }
+
+
+def load_locomotives(path=LOCOMOTIVES_FILE):
+    """Read the locomotive table of locomotivas-dcc.md into a dict keyed by DCC address."""
+    locomotives = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            cells = [MARKDOWN_LINK.sub(r'\1', c).strip() for c in line.strip().strip('|').split('|')]
+            if len(cells) < 7 or not cells[1].isdigit():
+                continue  # header, separator or other text
+            locomotives[int(cells[1])] = {
+                'manufacturer': cells[2],
+                'model': cells[3],
+                'era': cells[4],
+                'acquired': cells[5],
+                'prototype': cells[6],
+                # top speed of the prototype in km/h, if the table has it
+                'max_speed': float(cells[7]) if len(cells) > 7 and cells[7] else None,
+            }
+    return locomotives
+
+
+class SpeedStore:
+    """SQLite database of speed readings, indexed by DCC address and speed step."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def update_locomotives(self, locomotives):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO locomotives (address, manufacturer, model, prototype) VALUES (?, ?, ?, ?)',
+                [(address, loco['manufacturer'], loco['model'], loco['prototype'])
+                 for address, loco in locomotives.items()])
+
+    def append(self, address, step, readings):
+        """Store a batch of readings in one transaction."""
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO readings (address, step, received, device_ms, direction, dt_us, kmh) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(address, step, r['received'], r['device_ms'], r['direction'], r['dt_us'], r['kmh'])
+                 for r in readings])
+
+    def readings(self, address):
+        """Return (step, direction, kmh) of the readings of a locomotive, oldest first."""
+        return self.connection.execute(
+            'SELECT step, direction, kmh FROM readings WHERE address = ? ORDER BY id', (address,)).fetchall()
+
+    def step_readings(self):
+        """Return (address, step, direction, kmh) of every reading with a known speed step."""
+        return self.connection.execute(
+            'SELECT address, step, direction, kmh FROM readings WHERE step IS NOT NULL ORDER BY address, id').fetchall()
+
+    def summary(self):
+        """Return (address, model, prototype, readings, min km/h, max km/h) for each locomotive with readings."""
+        return self.connection.execute(
+            'SELECT r.address, l.model, l.prototype, COUNT(*), MIN(r.kmh), MAX(r.kmh) '
+            'FROM readings r LEFT JOIN locomotives l ON l.address = r.address '
+            'GROUP BY r.address ORDER BY r.address').fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+def open_serial(port, baud=DEFAULT_BAUD):
+    """Open a serial port (or pty) in raw mode for reading."""
+    fd = os.open(port, os.O_RDONLY | os.O_NOCTTY)
+    tty.setraw(fd)
+    attributes = termios.tcgetattr(fd)
+    speed = getattr(termios, f'B{baud}')
+    attributes[4] = attributes[5] = speed  # input and output speed
+    termios.tcsetattr(fd, termios.TCSANOW, attributes)
+    return os.fdopen(fd, 'rb', buffering=0)
+
+
+async def collect(port, store, address, step=None, baud=DEFAULT_BAUD,
+                  batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL, count=None):
+    """Read telemetry lines from 'port' and append the readings to 'store' in batches.
+
+    A batch is written when it has 'batch_size' readings or when no reading arrived
+    for 'flush_interval' seconds. Stops after 'count' readings, or at end of file.
+    Returns the number of readings stored.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                                open_serial(port, baud))
+    batch = []
+    stored = 0
+    try:
+        while count is None or stored + len(batch) < count:
+            try:
+                line = await asyncio.wait_for(reader.readline(), flush_interval)
+            except asyncio.TimeoutError:
+                line = None
+            except OSError:  # the other end of a pty was closed
+                break
+            if line == b'':
+                break
+            if line:
+                reading = parse_reading(line.decode('ascii', 'replace'))
+                if reading is not None:
+                    batch.append(reading)
+                    print(f"{address:>5} {reading['direction']} {reading['kmh']:>7.1f} km/h")
+            if batch and (line is None or len(batch) >= batch_size):
+                store.append(address, step, batch)
+                stored += len(batch)
+                batch = []
+    finally:
+        transport.close()
+        if batch:
+            store.append(address, step, batch)
+            stored += len(batch)
+    return stored
+
+
+async def simulate_device(fd, count, kmh, interval=0.2):
+    """Write 'count' telemetry lines around 'kmh' to 'fd', like speedmonitor.py on a pty."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for i in range(count):
+        await asyncio.sleep(interval)
+        v = random.gauss(kmh, kmh * 0.02)
+        dt = round(SENSOR_DISTANCE / (v / 3.6 / H0_SCALE) * 1e6)
+        direction = 'R' if i % 2 == 0 else 'L'
+        device_ms = round((loop.time() - start) * 1000)
+        os.write(fd, f"{i} samples/s\r\nv,{device_ms},{direction},{dt},{v:.1f}\r\n".encode('ascii'))
+
+
+async def simulate(store, address, step, count, kmh):
+    """Collect 'count' simulated readings through a pty, as from a real device."""
+    master, slave = os.openpty()
+    port = os.ttyname(slave)
+    try:
+        device = asyncio.create_task(simulate_device(master, count, kmh))
+        stored = await collect(port, store, address, step, batch_size=DEFAULT_BATCH_SIZE,
+                               flush_interval=1.0, count=count)
+        await device
+    finally:
+        os.close(master)
+        os.close(slave)
+    return stored
+
+
+def print_summary(store):
+    """Print the readings per locomotive in a formatted table."""
+    rows = store.summary()
+    if not rows:
+        print("No readings stored.")
+        return
+    print(f"{'DCC':>5} {'Model':<8} {'Prototype':<40} {'Readings':>8} {'Min km/h':>9} {'Max km/h':>9}")
+    print("-" * 84)
+    for address, model, prototype, count, low, high in rows:
+        print(f"{address:>5} {model or '?':<8} {(prototype or '?')[:40]:<40} {count:>8} {low:>9.1f} {high:>9.1f}")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[1])
+    parser.add_argument('--port', default=DEFAULT_PORT, help='serial port of the speed monitor')
+    parser.add_argument('--baud', type=int, default=DEFAULT_BAUD, help='serial port speed')
+    parser.add_argument('--address', type=int, help='DCC address of the locomotive being measured')
+    parser.add_argument('--step', type=int, help='decoder speed step being measured')
+    parser.add_argument('--db', default=DEFAULT_DB, help='database file')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='readings written to the database at once')
+    parser.add_argument('--count', type=int, help='stop after this many readings')
+    parser.add_argument('--simulate', type=int, metavar='N',
+                        help='collect N readings from a simulated device on a pty instead of --port')
+    parser.add_argument('--kmh', type=float, default=80.0, help='speed of the simulated readings')
+    parser.add_argument('--list', action='store_true', help='list the stored readings per locomotive and exit')
+    args = parser.parse_args()
+
+    store = SpeedStore(args.db)
+    locomotives = load_locomotives()
+    store.update_locomotives(locomotives)
+    try:
+        if args.list:
+            print_summary(store)
+            return
+        if args.address is None:
+            parser.error('--address is required to collect readings')
+        if args.address not in locomotives:
+            parser.error(f"DCC address {args.address} is not in {LOCOMOTIVES_FILE.name}: "
+                         + ', '.join(str(a) for a in sorted(locomotives)))
+
+        loco = locomotives[args.address]
+        print(f"Collecting readings for {args.address}: {loco['manufacturer']} {loco['model']}, {loco['prototype']}")
+        if args.simulate:
+            stored = asyncio.run(simulate(store, args.address, args.step, args.simulate, args.kmh))
+        else:
+            stored = asyncio.run(collect(args.port, store, args.address, args.step, args.baud,
+                                         args.batch_size, count=args.count))
+        print(f"\n{stored} reading(s) stored in {args.db}")
+    except KeyboardInterrupt:
+        print("\nCollection interrupted by user.")
+    except OSError as e:
+        print(f"Could not read {args.port}: {e}", file=sys.stderr)
+        raise SystemExit(1)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
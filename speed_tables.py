@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+DCC Speed Table Calculator
+Fits the measured speeds of each locomotive and computes the 28-entry speed table
+(CV67-94) and the Vstart/Vmid/Vhigh CVs that make it run at prototype speeds.
+
+The readings must be taken with a linear speed curve (CV29 bit 4 clear and Vstart,
+Vmid and Vhigh at their defaults), so that each speed step drives the motor at
+step / top step of full power.
+
+    python speed_tables.py
+    python speed_tables.py 40 43 --max-speed 100
+    python speed_tables.py --lap 'Oval interno' 47 28 --db speeds.db
+"""
+
+import argparse
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+from speed_collector import DEFAULT_DB, H0_SCALE, LOCOMOTIVES_FILE, SpeedStore, load_locomotives
+
+SPEED_FILE = Path(__file__).parent / 'speed.ods'
+TABLE_STEPS = 28  # entries of the speed table, CV67-94
+FIRST_TABLE_CV = 67
+DRIVE_MAX = 255  # value of a CV for full power
+DEFAULT_STEPS = 28  # speed steps of the throttle when the readings were taken
+TOP_STEPS = {14: 14, 28: 28, 128: 126}  # highest speed step of each mode
+DEFAULT_CURVE = 1.0  # exponent of the target speed curve, 1 for a straight line
+MIN_FIT_STEPS = 2  # different speed steps needed to fit a locomotive
+SMOOTHING = 1e-3  # pulls the curvature of fits with few steps towards a straight line
+
+ODS = {
+    'table': 'urn:oasis:names:tc:opendocument:xmlns:table:1.0',
+    'office': 'urn:oasis:names:tc:opendocument:xmlns:office:1.0',
+}
+ODS_MAX_COLUMNS = 16  # rows are padded with thousands of empty repeated cells
+
+
+def ods_rows(path):
+    """Return the cells of the first sheet of an .ods file as lists of strings."""
+    with zipfile.ZipFile(path) as ods:
+        root = ET.fromstring(ods.read('content.xml'))
+    sheet = root.find(f".//{{{ODS['table']}}}table")
+    rows = []
+    for row in sheet.iter(f"{{{ODS['table']}}}table-row"):
+        cells = []
+        for cell in row:
+            repeat = int(cell.get(f"{{{ODS['table']}}}number-columns-repeated", '1'))
+            value = cell.get(f"{{{ODS['office']}}}value")  # numbers without their display format
+            text = value if value is not None else ''.join(cell.itertext())
+            cells.extend([text] * min(repeat, ODS_MAX_COLUMNS - len(cells)))
+        rows.append(cells)
+    return rows
+
+
+def load_laps(path=SPEED_FILE):
+    """Read the timed laps of speed.ods into a dict of oval name: (meters, seconds).
+
+    Each oval is a section titled by its name alone in the first column, with a
+    'comprimento total:' row followed by a row with the length in m and the lap time in s.
+    """
+    laps = {}
+    rows = ods_rows(path)
+    section = None
+    for i, cells in enumerate(rows):
+        if cells and cells[0] and not any(cells[1:]):
+            section = cells[0]
+        if 'comprimento total:' in cells and i + 1 < len(rows):
+            following = rows[i + 1]
+            if 'm' in following and 's' in following:
+                meters = float(following[following.index('m') - 1])
+                seconds = float(following[following.index('s') - 1])
+                laps[section] = (meters, seconds)
+    return laps
+
+
+def lap_speed(meters, seconds, scale=H0_SCALE):
+    """Return the scale speed in km/h of a model lap of 'meters' run in 'seconds'."""
+    return meters / seconds * scale * 3.6
+
+
+def drive_levels(steps, mode=DEFAULT_STEPS):
+    """Return the motor drive, 0 to 1, of throttle speed steps with a linear speed curve."""
+    return np.asarray(steps, dtype=float) / TOP_STEPS[mode]
+
+
+def loco_means(locos, values, count):
+    """Return the mean of 'values' for each of 'count' locomotives, nan for those without any."""
+    readings = np.bincount(locos, minlength=count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.bincount(locos, values, minlength=count) / readings
+
+
+def fit_curves(locos, drives, speeds, count):
+    """Fit speed = c0 + c1 * drive + c2 * drive**2 for 'count' locomotives at once.
+
+    'locos' holds the index of the locomotive of each reading. Returns a (count, 3)
+    array of coefficients and the residual of each reading in km/h.
+    """
+    design = np.stack([np.ones_like(drives), drives, drives ** 2], axis=1)
+    normal = np.zeros((count, 3, 3))
+    right = np.zeros((count, 3))
+    np.add.at(normal, locos, design[:, :, None] * design[:, None, :])
+    np.add.at(right, locos, design * speeds[:, None])
+    normal[:, 2, 2] += SMOOTHING * np.bincount(locos, minlength=count)
+    coefficients = np.linalg.solve(normal, right[:, :, None])[:, :, 0]
+    residuals = speeds - np.einsum('ij,ij->i', design, coefficients[locos])
+    return coefficients, residuals
+
+
+def speed_tables(coefficients, max_speeds, curve=DEFAULT_CURVE, resolution=DRIVE_MAX * 4):
+    """Return the speed tables, one row of TABLE_STEPS CV values per locomotive, and
+    the top speed each locomotive can reach, in km/h.
+
+    The target of step n is max_speed * (n / TABLE_STEPS) ** curve. The fitted curves
+    are sampled over the whole drive range, made non decreasing and inverted at once.
+    """
+    grid = np.linspace(0, 1, resolution + 1)
+    curves = coefficients @ np.stack([np.ones_like(grid), grid, grid ** 2])
+    curves = np.maximum.accumulate(np.maximum(curves, 0), axis=1)
+    targets = np.asarray(max_speeds)[:, None] * (np.arange(1, TABLE_STEPS + 1) / TABLE_STEPS) ** curve
+
+    # index of the first grid point at or above each target, then interpolate with the previous one
+    above = np.clip((curves[:, None, :] < targets[:, :, None]).sum(axis=2), 1, resolution)
+    rows = np.arange(len(curves))[:, None]
+    low, high = curves[rows, above - 1], curves[rows, above]
+    fraction = np.clip((targets - low) / np.where(high > low, high - low, 1), 0, 1)
+    drive = (above - 1 + fraction) / resolution
+    tables = np.clip(np.rint(drive * DRIVE_MAX), 1, DRIVE_MAX).astype(int)
+    return np.maximum.accumulate(tables, axis=1), curves[:, -1]
+
+
+def three_point_cvs(table):
+    """Return Vstart (CV2), Vmid (CV6) and Vhigh (CV5) approximating a speed table."""
+    return table[0], table[TABLE_STEPS // 2 - 1], table[-1]
+
+
+def direction_difference(locos, directions, speeds, residuals, count):
+    """Return the percent by which each locomotive runs faster forward (R) than in
+    reverse (L), from the residuals of its fit; nan without readings both ways."""
+    forward, reverse = (directions == 'R'), (directions == 'L')
+    difference = (loco_means(locos[forward], residuals[forward], count)
+                  - loco_means(locos[reverse], residuals[reverse], count))
+    return difference / loco_means(locos, speeds, count) * 100
+
+
+def print_tables(results):
+    """Print the results in a formatted table."""
+    print(f"{'DCC':>5} {'Model':<8} {'Prototype':<34} {'Readings':>8} {'Steps':>5} {'RMS':>5} "
+          f"{'R-L':>6} {'Target':>7} {'Reach':>7} {'CV2':>4} {'CV6':>4} {'CV5':>4}")
+    print("-" * 107)
+    for r in results:
+        difference = '-' if np.isnan(r['direction']) else f"{r['direction']:+.1f}%"
+        vstart, vmid, vhigh = r['three_point']
+        print(f"{r['address']:>5} {r['model']:<8} {r['prototype'][:34]:<34} {r['readings']:>8} {r['steps']:>5} "
+              f"{r['rms']:>5.1f} {difference:>6} {r['target']:>7.0f} {r['reach']:>7.0f} "
+              f"{vstart:>4} {vmid:>4} {vhigh:>4}")
+    for r in results:
+        print(f"\n{r['address']:>5} CV{FIRST_TABLE_CV}-{FIRST_TABLE_CV + TABLE_STEPS - 1}: "
+              + ' '.join(str(v) for v in r['table']))
+        if r['reach'] < r['target']:
+            print(f"      reaches only {r['reach']:.0f} of {r['target']:.0f} km/h; the top steps run at full power")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[1])
+    parser.add_argument('addresses', type=int, nargs='*', metavar='ADDRESS',
+                        help='DCC addresses of the locomotives (default: all with readings)')
+    parser.add_argument('--db', default=DEFAULT_DB, help='database of speed_collector.py')
+    parser.add_argument('--steps', type=int, choices=sorted(TOP_STEPS), default=DEFAULT_STEPS,
+                        help='speed steps of the throttle when the readings were taken')
+    parser.add_argument('--lap', nargs=3, action='append', default=[], metavar=('OVAL', 'ADDRESS', 'STEP'),
+                        help=f'add the lap timed on OVAL in {SPEED_FILE.name} as a reading of ADDRESS at STEP')
+    parser.add_argument('--max-speed', type=float,
+                        help='top speed in km/h for all the locomotives, e.g. to match a consist, '
+                             f'instead of the prototype speeds in {LOCOMOTIVES_FILE.name}')
+    parser.add_argument('--curve', type=float, default=DEFAULT_CURVE,
+                        help='exponent of the target speeds over the steps; above 1 gives finer low speeds')
+    args = parser.parse_args()
+
+    locomotives = load_locomotives()
+    store = SpeedStore(args.db)
+    try:
+        readings = store.step_readings()
+    finally:
+        store.close()
+    if args.lap:
+        laps = load_laps()
+        for oval, address, step in args.lap:
+            if oval not in laps:
+                parser.error(f"no lap {oval!r} in {SPEED_FILE.name}: " + ', '.join(laps))
+            readings.append((int(address), int(step), None, lap_speed(*laps[oval])))
+
+    addresses = args.addresses or sorted({r[0] for r in readings})
+    for address in args.addresses:
+        if address not in locomotives:
+            parser.error(f"DCC address {address} is not in {LOCOMOTIVES_FILE.name}")
+    selected = []
+    for address in addresses:
+        steps = {r[1] for r in readings if r[0] == address}
+        max_speed = args.max_speed or locomotives.get(address, {}).get('max_speed')
+        if len(steps) < MIN_FIT_STEPS:
+            print(f"Skipping {address}: readings at {len(steps)} speed step(s), "
+                  f"at least {MIN_FIT_STEPS} needed", file=sys.stderr)
+        elif not max_speed:
+            print(f"Skipping {address}: no prototype speed in {LOCOMOTIVES_FILE.name}, "
+                  "use --max-speed", file=sys.stderr)
+        else:
+            selected.append((address, max_speed, len(steps)))
+    if not selected:
+        print("No locomotive to calibrate.")
+        return
+
+    index = {address: i for i, (address, _, _) in enumerate(selected)}
+    rows = [r for r in readings if r[0] in index]
+    locos = np.array([index[r[0]] for r in rows])
+    drives = drive_levels([r[1] for r in rows], args.steps)
+    directions = np.array([r[2] for r in rows])
+    speeds = np.array([r[3] for r in rows], dtype=float)
+
+    count = len(selected)
+    coefficients, residuals = fit_curves(locos, drives, speeds, count)
+    rms = np.sqrt(loco_means(locos, residuals ** 2, count))
+    differences = direction_difference(locos, directions, speeds, residuals, count)
+    tables, reach = speed_tables(coefficients, [s[1] for s in selected], args.curve)
+
+    results = []
+    for i, (address, max_speed, steps) in enumerate(selected):
+        loco = locomotives.get(address, {})
+        results.append({
+            'address': address,
+            'model': loco.get('model', '?'),
+            'prototype': loco.get('prototype', '?'),
+            'readings': int((locos == i).sum()),
+            'steps': steps,
+            'rms': rms[i],
+            'direction': differences[i],
+            'target': max_speed,
+            'reach': reach[i],
+            'table': tables[i].tolist(),
+            'three_point': three_point_cvs(tables[i].tolist()),
+        })
+    print_tables(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 from microbit import *
 from micropython import const
+from utime import ticks_us, ticks_ms, ticks_diff
+from array import array
+import gc
 
 DARK_THRESHOLD = const(400)  # ADC range 0:1024
 SCROLL_DELAY = const(90)  # ms
 SENSOR_DISTANCE = const(64 / 1000)  # meters
+# positions along the track of the gates on GATE_PINS, in mm; with more than two
+# gates the multi-gate speed trap is used, which also measures acceleration and length
+GATE_POSITIONS = (0, 64)
+GATE_PINS = (pin0, pin1, pin2)
+CLEAR_TIME = const(500000)  # us all gates must stay lit for a train to have passed
+TRAIN_TIMEOUT = const(20000000)  # us without any edge after which a train is given up
 H0_SCALE = const(87)  # 1:87
+MAX_SPEED = const(300)  # km/h, faster readings are invalid
+# besides serial, send each reading over radio, e.g. to a micro:bit plugged into the host
+TELEMETRY_RADIO = False
 
 READY_SYMBOL = Image.YES
 LEFT_ARROW = Image.ARROW_W
@@ -12,15 +24,54 @@ RIGHT_ARROW = Image.ARROW_E
 
 ANALOG_MAX = 1023
 
+if TELEMETRY_RADIO:
+    import radio
+
+# raw sensor trace: up to TRACE_SAMPLES samples of both pins, one every TRACE_EVERY passes
+# of the sampling loop (about 1.5 ms), so the last 2 s or so fit in 6 KB. With less free
+# memory, as on a micro:bit V1, the trace gets 1/TRACE_MEMORY of it and keeps less time
+TRACE_SAMPLES = const(1000)
+TRACE_MEMORY = const(4)
+TRACE_EVERY = const(32)  # power of 2
+TRACE_MASK = const(TRACE_EVERY - 1)
+DELTA_MAX = const(65535)  # longer gaps between samples are stored as this
+
+# after calibration, the lit level of each sensor keeps being tracked while waiting
+# for trains, as an integer exponential moving average of one sample every TRACE_EVERY
+# passes, with a weight of 1 / 2**LEVEL_SHIFT (a time constant of about 0.5 s)
+LEVEL_SHIFT = const(8)
+# percent of the range between the dark and lit levels separating the threshold
+# to go dark (below the middle) from the one to be lit again (above it)
+HYSTERESIS = const(20)
+
+# without trains for ACTIVE_TIME, the sensors are polled every IDLE_POLL ms instead of
+# in the tight sampling loop, and twice as seldom after each further ACTIVE_TIME up to
+# the limit of poll_limit(), until one falls WAKE_MARGIN percent of its range below the
+# lit level: a train front takes a few ms to cross the beam, so this usually wakes the
+# loop before the sensor is dark. When the front is faster than the poll, the loop
+# still wakes before it reaches the next sensor, and the train is timed by the rear of
+# its first vehicle instead; the reading is dropped unless both sensors were dark for
+# times within LATE_TOLERANCE percent, allowing for the poll the front was missed in
+ACTIVE_TIME = const(30000)  # ms
+IDLE_POLL = const(1)  # ms
+WAKE_MARGIN = const(15)
+LATE_TOLERANCE = const(10)
+REPORT_INTERVAL = const(60000)  # ms between activity telemetry lines
+
 
 class Sensor():
     def __init__(self, pin):
         self.pin = pin
         self.min = ANALOG_MAX
         self.max = 0
+        # lit level times 2**LEVEL_SHIFT
+        self.level = 0
+        # below threshold the sensor goes dark, above lit_threshold it is lit again
         self.threshold = 0
-        # last time when pin went dark
-        self.dark_time = 0
+        self.lit_threshold = 0
+        self.wake_threshold = 0  # below it a dozing sensor wakes up
+        # last time when pin went dark, from ticks_us(); None while lit
+        self.dark_time = None
 
     def calibrate(self):
         value = self.pin.read_analog()
@@ -28,23 +79,89 @@ class Sensor():
             self.min = value
         elif value > self.max:
             self.max = value
-        self.threshold = round((self.min + self.max) / 2)
+        self.level = self.max << LEVEL_SHIFT
+        self.set_thresholds()
+
+    def track(self, value):
+        # move the lit level towards 'value', a sample taken while lit
+        self.level += value - (self.level >> LEVEL_SHIFT)
+        self.set_thresholds()
+
+    def set_thresholds(self):
+        lit = self.level >> LEVEL_SHIFT
+        middle = (self.min + lit) >> 1
+        band = (lit - self.min) * HYSTERESIS // 200
+        self.threshold = middle - band
+        self.lit_threshold = middle + band
+        self.wake_threshold = lit - (lit - self.min) * WAKE_MARGIN // 100
 
     def dark(self):
-        if self.pin.read_analog() < self.threshold:
-            if self.dark_time == 0:
-                self.dark_time = running_time()
-            return True
-        else:
+        # once dark, the sensor stays dark until it is above lit_threshold
+        value = self.pin.read_analog()
+        if self.dark_time is None:
+            if value < self.threshold:
+                self.dark_time = ticks_us()
+                return True
             return False
+        return value <= self.lit_threshold
 
     def restart(self):
-        self.dark_time = 0
+        self.dark_time = None
+
+
+class TraceBuffer():
+    # ring buffer of (microseconds since previous sample, pin0, pin1) triples,
+    # preallocated so that recording does not allocate memory in the sampling loop
+    def __init__(self, pin_a, pin_b):
+        self.read_a = pin_a.read_analog
+        self.read_b = pin_b.read_analog
+        gc.collect()
+        samples = min(TRACE_SAMPLES, gc.mem_free() // (6 * TRACE_MEMORY))
+        # from a range, whose length is known, the array is allocated once without a
+        # temporary list; the initial values do not matter, only recorded samples are dumped
+        self.data = array('H', range(3 * samples))
+        self.index = 0  # position of the next sample in data
+        self.full = False  # data wrapped around, so all of it is valid
+        self.last_time = ticks_us()
+        # stop recording to keep the trace of a bad reading until it is dumped
+        self.frozen = False
+
+    def record(self):
+        if self.frozen:
+            return
+        now = ticks_us()
+        data = self.data
+        i = self.index
+        data[i] = min(ticks_diff(now, self.last_time), DELTA_MAX)
+        data[i + 1] = self.read_a()
+        data[i + 2] = self.read_b()
+        self.last_time = now
+        i += 3
+        if i == len(data):
+            i = 0
+            self.full = True
+        self.index = i
+
+    def dump(self):
+        # print the trace over serial, oldest first, as 't_us,pin0,pin1' lines;
+        # the first sample is at time 0 and gaps longer than DELTA_MAX are shortened
+        data = self.data
+        start = self.index if self.full else 0
+        count = len(data) // 3 if self.full else self.index // 3
+        print('# trace of {} samples'.format(count))
+        t = 0
+        for n in range(count):
+            i = (start + 3 * n) % len(data)
+            if n:
+                t += data[i]
+            print('{},{},{}'.format(t, data[i + 1], data[i + 2]))
+        print('# end of trace')
+        self.frozen = False
 
 
 def model_speed(dt):
-    # return model meters per second
-    secs = dt / 1000
+    # return model meters per second, dt in microseconds
+    secs = dt / 1000000
     try:
         return SENSOR_DISTANCE / secs
     except ZeroDivisionError:
@@ -57,6 +174,15 @@ def speed(dt):
     return scaled * 3.6  # km/h
 
 
+def emit_reading(direction, dt, v):
+    # telemetry line read by speed_collector.py on the host:
+    # v,<running_time() ms>,<R or L>,<dt microseconds>,<km/h>
+    line = 'v,{},{},{},{:.1f}'.format(running_time(), direction, dt, v)
+    print(line)
+    if TELEMETRY_RADIO:
+        radio.send(line)
+
+
 def wait_until_ready(sensors):
     # wait until lasers illuminate both sensors
     display.show('?')
@@ -64,38 +190,394 @@ def wait_until_ready(sensors):
         sleep(50)
 
 
-def measure(sensors):
+def poll_limit(spacing):
+    # longest idle poll in ms, IDLE_POLL times a power of 2, of at most a quarter of
+    # the time a train at MAX_SPEED takes to go 'spacing' mm, so that dozing wakes the
+    # loop well before a front missed at one sensor reaches the next one
+    travel = spacing * 36 * H0_SCALE // (10 * MAX_SPEED)  # ms, as model mm/ms = km/h / 3.6 / scale
+    poll = IDLE_POLL
+    while poll * 8 <= travel:
+        poll <<= 1
+    return poll
 
+
+class DutyCycle():
+    # decides when the idle sensors may be polled slowly and keeps the share of
+    # time spent sampling at full rate, reported as telemetry every REPORT_INTERVAL:
+    # a,<running_time() ms>,<percent of time at full rate>,<wake ups>
+    def __init__(self, poll_max):
+        self.poll_max = poll_max  # ms, from poll_limit()
+        self.poll = 0  # ms between the polls when the last doze woke up
+        now = ticks_ms()
+        self.last_activity = now
+        self.active_since = now  # None while dozing
+        self.active_time = 0  # ms at full rate since the last report
+        self.wakes = 0
+        self.report_time = now
+
+    def active(self):
+        self.last_activity = ticks_ms()
+
+    def idle(self):
+        return ticks_diff(ticks_ms(), self.last_activity) > ACTIVE_TIME
+
+    def doze(self):
+        self.active_time += ticks_diff(ticks_ms(), self.active_since)
+        self.active_since = None
+
+    def wake(self):
+        now = ticks_ms()
+        self.active_since = now
+        self.last_activity = now
+        self.wakes += 1
+
+    def report(self):
+        now = ticks_ms()
+        elapsed = ticks_diff(now, self.report_time)
+        if elapsed < REPORT_INTERVAL:
+            return
+        active = self.active_time
+        if self.active_since is not None:
+            active += ticks_diff(now, self.active_since)
+            self.active_since = now
+        line = 'a,{},{},{}'.format(running_time(), active * 100 // elapsed, self.wakes)
+        print(line)
+        if TELEMETRY_RADIO:
+            radio.send(line)
+        self.active_time = 0
+        self.wakes = 0
+        self.report_time = now
+
+
+def doze(sensors, trace, duty):
+    # poll 'sensors' until one is below its wake threshold, every IDLE_POLL ms at
+    # first and up to every duty.poll_max ms the longer they stay idle. Return None
+    # if the sensor woke before it was dark, or its index if it went dark between
+    # two polls, so the time its front went dark is not known.
+    # Every TRACE_EVERY polls, record the trace, track the lit levels and
+    # handle button A and the activity report, as the sampling loops do.
+    duty.doze()
+    interval = IDLE_POLL
+    since = ticks_ms()
+    polls = 0
     while True:
-        if sensors[0].dark_time == 0 and sensors[0].dark():
-            if sensors[1].dark_time == 0:
-                display.show(RIGHT_ARROW)
-
-        if sensors[1].dark_time == 0 and sensors[1].dark():
-            if sensors[0].dark_time == 0:
-                display.show(LEFT_ARROW)
-
-        if sensors[0].dark_time and sensors[1].dark_time:
-            dt = abs(sensors[1].dark_time - sensors[0].dark_time)  # milliseconds
-            v = int(speed(dt))
-            if 0 < v < 300:  # avoid invalid readings
-                display.scroll('{}km/h'.format(v), delay=SCROLL_DELAY)
-            else:
-                wait_until_ready(sensors)
-                sleep(1000)  # wait for train to pass
-            # Restart timers for next events
+        for i in range(len(sensors)):
+            value = sensors[i].pin.read_analog()
+            if value < sensors[i].wake_threshold:
+                duty.wake()
+                duty.poll = interval
+                return i if value < sensors[i].threshold else None
+        sleep(interval)
+        polls += 1
+        if not polls & TRACE_MASK:
+            trace.record()
             for sensor in sensors:
-                sensor.restart()
-            display.show(READY_SYMBOL)
+                value = sensor.pin.read_analog()
+                if value > sensor.lit_threshold:
+                    sensor.track(value)
+            if button_a.was_pressed():
+                trace.dump()
+            duty.report()
+            if interval < duty.poll_max and ticks_diff(ticks_ms(), since) > ACTIVE_TIME:
+                interval <<= 1
+                since = ticks_ms()
+
+
+# The sampling loops below are the hot path: they keep the bound methods and thresholds
+# in locals and do one read_analog() and one comparison per sample, without sleeping,
+# so an edge is stamped within one sample period (tens of microseconds) rather than
+# within the 1 ms resolution of running_time(). Every TRACE_EVERY passes they also
+# record both sensors in the trace buffer and, while no train is passing, track the
+# lit level of the sensors with their last samples, reloading the thresholds, and
+# doze when there were no trains for ACTIVE_TIME.
+
+def wait_for_train(sensors, trace, duty):
+    # sample both sensors until one goes dark;
+    # return its index and the ticks_us() when it went dark,
+    # or None if it went dark while dozing.
+    # button A dumps the trace buffer while waiting.
+    sensor0, sensor1 = sensors[0], sensors[1]
+    read0 = sensor0.pin.read_analog
+    read1 = sensor1.pin.read_analog
+    threshold0 = sensor0.threshold
+    threshold1 = sensor1.threshold
+    record = trace.record
+    passes = 0
+    while True:
+        value0 = read0()
+        if value0 < threshold0:
+            return 0, ticks_us()
+        value1 = read1()
+        if value1 < threshold1:
+            return 1, ticks_us()
+        passes += 1
+        if not passes & TRACE_MASK:
+            record()
+            if value0 > sensor0.lit_threshold and value1 > sensor1.lit_threshold:
+                sensor0.track(value0)  # not while the rear of a train is leaving
+                sensor1.track(value1)
+            if button_a.was_pressed():
+                trace.dump()
+            duty.report()
+            if duty.idle():
+                late = doze(sensors, trace, duty)
+                if late is not None:
+                    return late, None
+            threshold0 = sensor0.threshold
+            threshold1 = sensor1.threshold
+
 
-        if sensors[0].dark_time or sensors[1].dark_time:
-            continue  # ongoing measurement, skip delay
+def wait_for_dark(sensor, trace):
+    # sample one sensor until it goes dark;
+    # return the ticks_us() when it went dark and the number of samples taken
+    read = sensor.pin.read_analog
+    threshold = sensor.threshold
+    record = trace.record
+    samples = 0
+    while read() >= threshold:
+        samples += 1
+        if not samples & TRACE_MASK:
+            record()
+    return ticks_us(), samples
 
-        sleep(10)  # delay to save battery
+
+def wait_for_rear(first, second, trace):
+    # sample both sensors, 'first' dark already, until 'second' goes dark and is
+    # lit again; return the ticks_us() when 'first' was lit again, or None if it
+    # was not before, and when 'second' went dark and was lit again
+    read_a = first.pin.read_analog
+    read_b = second.pin.read_analog
+    lit_a = first.lit_threshold
+    dark_b = second.threshold
+    lit_b = second.lit_threshold
+    record = trace.record
+    rear_a = front_b = None
+    samples = 0
+    while True:
+        now = ticks_us()
+        if rear_a is None and read_a() > lit_a:
+            rear_a = now
+        value = read_b()
+        if front_b is None:
+            if value < dark_b:
+                front_b = now
+        elif value > lit_b:
+            return rear_a, front_b, now
+        samples += 1
+        if not samples & TRACE_MASK:
+            record()
+
+
+def same_vehicle(seen, dark, poll):
+    # whether a sensor seen dark for 'seen' us after a doze polling every 'poll' ms
+    # and one dark for 'dark' us were shaded by the same vehicle, which leaves them
+    # at about the same speed, rather than by different cars or gaps
+    margin = dark * LATE_TOLERANCE // 100
+    return dark - margin - poll * 1000 <= seen <= dark + margin
+
+
+def measure(sensors, trace, duty):
+
+    while True:
+        first, start = wait_for_train(sensors, trace, duty)
+        display.show(RIGHT_ARROW if first == 0 else LEFT_ARROW)
+        second = sensors[1 - first]
+
+        if start is None:
+            # the front passed the first sensor while dozing: time the rear of the
+            # first vehicle at both sensors instead, which is only valid when both
+            # were dark for similar times; else the reading is dropped as invalid
+            woke = ticks_us()
+            start, second.dark_time, end = wait_for_rear(sensors[first], second, trace)
+            trace.record()
+            dt = 0
+            if start is not None and same_vehicle(ticks_diff(start, woke),
+                                                   ticks_diff(end, second.dark_time), duty.poll):
+                dt = ticks_diff(end, start)
+        else:
+            sensors[first].dark_time = start
+            trace.record()  # the first edge
+            sampling_start = ticks_us()
+            second.dark_time, samples = wait_for_dark(second, trace)
+            trace.record()  # the second edge
+            sampling_time = ticks_diff(second.dark_time, sampling_start)
+            print('{} samples/s'.format(samples * 1000000 // max(sampling_time, 1)))
+            dt = ticks_diff(second.dark_time, start)  # microseconds, wrap-safe
+        kmh = speed(dt)
+        v = int(kmh)
+        if 0 < v < MAX_SPEED:  # avoid invalid readings
+            emit_reading('R' if first == 0 else 'L', dt, kmh)
+            display.scroll('{}km/h'.format(v), delay=SCROLL_DELAY)
+            wait_until_ready(sensors)  # a slow train may still be passing
+        else:
+            trace.frozen = True  # keep this crossing until button A dumps it
+            wait_until_ready(sensors)
+            sleep(1000)  # wait for train to pass
+        # Restart timers for next events
+        for sensor in sensors:
+            sensor.restart()
+        duty.active()
+        display.show(READY_SYMBOL)
+
+
+# The speed trap samples every gate on each pass and keeps, for each gate, the time
+# its sensor went dark (the front of the train) and the time it was last lit again
+# (the end of the last car), so memory does not grow with the length of the train.
+
+class Gate():
+    def __init__(self, sensor, position):
+        self.sensor = sensor
+        self.position = position  # mm along the track
+        # last time when the sensor was lit again after being dark, from ticks_us()
+        self.exit_time = None
+        # the sensor went dark while dozing, so its dark_time is late
+        self.late = False
+
+    def restart(self):
+        self.sensor.restart()
+        self.exit_time = None
+        self.late = False
+
+    def edge(self, rear):
+        # ticks_us() when the front of the train reached the gate, or when its rear left it
+        return self.exit_time if rear else self.sensor.dark_time
+
+
+def time_train(gates, trace, duty):
+    # sample all gates until a train has passed them, stamping the entry (dark_time
+    # of the sensor) and exit of each one. The samples of a pass share its timestamp.
+    # Return True when every gate was crossed and has been lit for CLEAR_TIME,
+    # False when no gate changed for TRAIN_TIMEOUT before that.
+    count = len(gates)
+    reads = [g.sensor.pin.read_analog for g in gates]
+    thresholds = [g.sensor.threshold for g in gates]
+    lit_thresholds = [g.sensor.lit_threshold for g in gates]
+    values = [0] * count  # last sample of each gate
+    dark = [False] * count
+    dark_count = 0
+    exit_count = 0
+    last_edge = None
+    passes = 0
+    while True:
+        now = ticks_us()
+        for i in range(count):
+            value = reads[i]()
+            values[i] = value
+            if dark[i]:
+                if value > lit_thresholds[i]:
+                    dark[i] = False
+                    dark_count -= 1
+                    last_edge = now
+                    if gates[i].exit_time is None:
+                        exit_count += 1
+                    gates[i].exit_time = now
+            elif value < thresholds[i]:
+                dark[i] = True
+                dark_count += 1
+                last_edge = now
+                if gates[i].sensor.dark_time is None:
+                    gates[i].sensor.dark_time = now
+        passes += 1
+        if not passes & TRACE_MASK:
+            trace.record()
+            if last_edge is None:
+                for i in range(count):
+                    sensor = gates[i].sensor
+                    if values[i] > lit_thresholds[i]:
+                        sensor.track(values[i])
+                    thresholds[i] = sensor.threshold
+                    lit_thresholds[i] = sensor.lit_threshold
+                if button_a.was_pressed():
+                    trace.dump()
+                duty.report()
+                if duty.idle():
+                    late = doze([g.sensor for g in gates], trace, duty)
+                    if late is not None:
+                        gates[late].late = True
+                    for i in range(count):
+                        thresholds[i] = gates[i].sensor.threshold
+                        lit_thresholds[i] = gates[i].sensor.lit_threshold
+        if last_edge is not None:
+            quiet = ticks_diff(now, last_edge)
+            if dark_count == 0 and exit_count == count and quiet > CLEAR_TIME:
+                return True
+            if quiet > TRAIN_TIMEOUT:
+                return False
+
+
+def train_stats(gates):
+    # average speed in km/h, acceleration in km/h per second and train length in mm
+    # of a train that crossed 'gates', given in the order it crossed them.
+    # The acceleration is the slope of a least squares line through the speeds
+    # between consecutive gates, and the length is the time each gate was dark
+    # times the speed of that line halfway through, averaged over the gates.
+    # When the front went past a gate while dozing, the speeds are timed by the
+    # rear of the train instead and that gate is left out of the length.
+    rear = any(g.late for g in gates)
+    start = gates[0].edge(rear)
+    times = []  # ms since the first entry, of the middle of each segment
+    speeds = []  # m/s of each segment
+    for a, b in zip(gates, gates[1:]):
+        entry_a = ticks_diff(a.edge(rear), start) / 1000
+        entry_b = ticks_diff(b.edge(rear), start) / 1000
+        if entry_b <= entry_a:
+            return None
+        times.append((entry_a + entry_b) / 2)
+        speeds.append(abs(b.position - a.position) / (entry_b - entry_a))
+    mean_time = sum(times) / len(times)
+    mean_speed = sum(speeds) / len(speeds)
+    variance = sum((t - mean_time) ** 2 for t in times)
+    slope = 0  # m/s per ms
+    if variance:
+        slope = sum((t - mean_time) * (v - mean_speed) for t, v in zip(times, speeds)) / variance
+
+    lengths = 0
+    timed = [g for g in gates if not g.late]
+    for gate in timed:
+        entry = ticks_diff(gate.sensor.dark_time, start) / 1000
+        dark = ticks_diff(gate.exit_time, gate.sensor.dark_time) / 1000
+        lengths += (mean_speed + slope * (entry + dark / 2 - mean_time)) * dark
+    distance = abs(gates[-1].position - gates[0].position)
+    total_time = ticks_diff(gates[-1].edge(rear), start) / 1000
+    scale = H0_SCALE * 3.6
+    return distance / total_time * scale, slope * 1000 * scale, lengths / len(timed)
+
+
+def speed_trap(gates, trace, duty):
+    # time trains over any number of gates, emitting a 'g' telemetry line per gate
+    # and a 't' line per train besides the usual reading:
+    # g,<train>,<gate>,<entry ms>,<exit ms>  (since the first entry)
+    # t,<train>,<R or L>,<km/h>,<km/h per s>,<length mm>
+    train = 0
+    while True:
+        passed = time_train(gates, trace, duty)
+        ordered = gates
+        if passed and ticks_diff(gates[-1].sensor.dark_time, gates[0].sensor.dark_time) < 0:
+            ordered = gates[::-1]
+        stats = train_stats(ordered) if passed else None
+        if stats is None or not 0 < int(stats[0]) < MAX_SPEED:  # avoid invalid readings
+            trace.frozen = True  # keep this crossing until button A dumps it
+            display.show(Image.NO)
+        else:
+            train += 1
+            kmh, acceleration, length = stats
+            direction = 'R' if ordered is gates else 'L'
+            start = ordered[0].sensor.dark_time
+            for i, gate in enumerate(gates):
+                print('g,{},{},{},{}'.format(train, i, ticks_diff(gate.sensor.dark_time, start) // 1000,
+                                             ticks_diff(gate.exit_time, start) // 1000))
+            print('t,{},{},{:.1f},{:.2f},{:.0f}'.format(train, direction, kmh, acceleration, length))
+            rear = any(g.late for g in gates)
+            emit_reading(direction, ticks_diff(ordered[-1].edge(rear), ordered[0].edge(rear)), kmh)
+            display.scroll('{}km/h'.format(int(kmh)), delay=SCROLL_DELAY)
+        wait_until_ready([g.sensor for g in gates])
+        for gate in gates:
+            gate.restart()
+        duty.active()
+        display.show(READY_SYMBOL)
 
 
-def show_bar(side, percent):
-    x = 0 if side == 0 else 4
+def show_bar(column, percent):
     full, partial = divmod(round(percent), 20)
     for i in range(5):
         if i <= full:
@@ -104,31 +586,40 @@ def show_bar(side, percent):
             brightness = round(9 * partial / 20)
         else:
             brightness = 0
-        display.set_pixel(x, 4-i, brightness)
+        display.set_pixel(column, 4-i, brightness)
 
 
 def calibrate(sensors):
     display.clear()
+    last = len(sensors) - 1
     while not button_b.was_pressed():
-        light0 = pin0.read_analog()
-        show_bar(0, light0/1023.0 * 100)
-        sensors[0].calibrate()
-        light1 = pin1.read_analog()
-        show_bar(1, light1/1023.0 * 100)
-        sensors[1].calibrate()
-        # print((light0, light1))  # data for mu plotter
+        for i, sensor in enumerate(sensors):
+            light = sensor.pin.read_analog()
+            show_bar(i * 4 // max(last, 1), light/1023.0 * 100)
+            sensor.calibrate()
+        # print([s.pin.read_analog() for s in sensors])  # data for mu plotter
         sleep(10)
 
 
 def main():
-    sensors = [Sensor(pin0), Sensor(pin1)]
+    sensors = [Sensor(pin) for pin in GATE_PINS[:len(GATE_POSITIONS)]]
     display.scroll('press B to calibrate', delay=SCROLL_DELAY, wait=False)
     while not button_b.was_pressed():
         sleep(10)
     calibrate(sensors)
     wait_until_ready(sensors)
+    for sensor in sensors:
+        sensor.restart()  # dark() stamped them while the hand left the beams
+    if TELEMETRY_RADIO:
+        radio.on()
     display.show(READY_SYMBOL)
-    measure(sensors)
+    trace = TraceBuffer(pin0, pin1)
+    duty = DutyCycle(poll_limit(min(abs(b - a) for a, b in zip(GATE_POSITIONS, GATE_POSITIONS[1:]))))
+    if len(sensors) > 2:
+        speed_trap([Gate(s, p) for s, p in zip(sensors, GATE_POSITIONS)], trace, duty)
+    else:
+        measure(sensors, trace, duty)
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -79,4 +79,5 @@ def main():
     display.show(READY_SYMBOL)
     measure()
 
-main()
+if __name__ == '__main__':
+    main()